@@ -1,5 +1,11 @@
+import os
+import re
+import signal
+import selectors
 import subprocess
 import sys
+import time
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 #!/usr/bin/env python3
 """
@@ -27,8 +33,30 @@ Backpressure Mechanism:
     - If grep reads slowly, pipe buffer fills
     - Kernel blocks our write() syscall until space available
     - Prevents unbounded memory growth
+
+Streaming Pipeline (stream_filter):
+    input (iterator or fd) ──> [chain 1: grep | cut ...] ──┐
+         │                 ──> [chain 2: grep | cut ...] ──┼──> yielded lines
+         └─ taken only when a chain can accept it ──────────┘
+    - One selector watches every chain's stdin (writable) and stdout (readable)
+    - All pipe FDs are non-blocking: a full pipe means "try another chain",
+      never a stuck write() while output piles up on the other side
+    - Memory is bounded: at most one pending input item per chain and one
+      read() worth of output, whatever the stream length
+    - Backpressure end to end: a slow consumer stops the generator, so we
+      stop reading, the filters block on their stdout, stop reading stdin,
+      and we stop pulling from the input iterator
+
+In-Process Matching (MultiPatternMatcher / match_filter):
+    - For hot paths a fork+exec of grep per batch costs milliseconds; a
+      compiled alternation of all patterns runs in the regex engine's C loop
+    - The regex only locates candidate lines; which patterns hit each line
+      is resolved from the matches found there (see line_mask)
 """
 
+READ_SIZE = 65536  # bytes per read() from a filter's stdout
+Command = Sequence[str]
+
 
 
 def monitor_grep():
@@ -123,6 +151,417 @@ INFO: cache hit ratio: 95%
         sys.exit(1)
 
 
+class FilterChain:
+    """
+    One pipeline of filter processes (e.g. grep | cut), wired child to child.
+    The parent only holds the first stdin and the last stdout, both
+    non-blocking.
+    """
+
+    def __init__(self, commands: Sequence[Command]):
+        self.procs: List[subprocess.Popen] = []
+        try:
+            for argv in commands:
+                upstream = self.procs[-1].stdout if self.procs else subprocess.PIPE
+                self.procs.append(subprocess.Popen(argv, stdin=upstream, stdout=subprocess.PIPE))
+                if upstream is not subprocess.PIPE:
+                    # The next child owns this pipe end now; keeping our copy open
+                    # would stop it from ever seeing EOF
+                    upstream.close()
+        except BaseException:
+            # e.g. a later command not found: don't leave the earlier ones running
+            for proc in self.procs:
+                for pipe in (proc.stdin, proc.stdout):
+                    if pipe is not None:
+                        pipe.close()
+            self.kill()
+            raise
+        self.stdin = self.procs[0].stdin
+        self.stdout = self.procs[-1].stdout
+        os.set_blocking(self.stdin.fileno(), False)
+        os.set_blocking(self.stdout.fileno(), False)
+        self.pending: Optional[memoryview] = None  # input item being written
+        self.partial = b""  # output after the last newline seen
+
+    def close_input(self, selector: selectors.BaseSelector) -> None:
+        if not self.stdin.closed:
+            if self.stdin in selector.get_map():
+                selector.unregister(self.stdin)
+            self.stdin.close()  # EOF for the first filter
+        self.pending = None
+
+    def split_lines(self, data: bytes) -> List[bytes]:
+        """Complete lines of partial + data; the unterminated rest is kept."""
+        data = self.partial + data
+        cut = data.rfind(b"\n") + 1
+        self.partial = data[cut:]
+        return data[:cut].splitlines(keepends=True)
+
+    def kill(self) -> None:
+        """Stop every process that is still running (early generator close)."""
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+
+    def check(self, ok_codes: Sequence[int]) -> None:
+        """
+        Raise CalledProcessError for a filter that failed. An upstream filter
+        killed by SIGPIPE is fine: a later one (head -n) stopped reading.
+        """
+        for i, proc in enumerate(self.procs):
+            code = proc.wait()
+            if code in ok_codes or (code == -signal.SIGPIPE and i < len(self.procs) - 1):
+                continue
+            raise subprocess.CalledProcessError(code, proc.args)
+
+
+def read_blocks(fd: int) -> Iterator[bytes]:
+    """Newline-aligned blocks read from fd with plain blocking os.read calls."""
+    carry = b""
+    while True:
+        data = os.read(fd, READ_SIZE)
+        if not data:
+            if carry:
+                yield carry
+            return
+        data = carry + data
+        cut = data.rfind(b"\n") + 1
+        carry = data[cut:]
+        if cut:
+            yield data[:cut]
+
+
+def stream_filter(source: Union[Iterable[Union[bytes, str]], IO],
+                  commands: Union[Command, Sequence[Command]] = ("grep", "--line-buffered", "ERROR"),
+                  workers: int = 1,
+                  ok_codes: Sequence[int] = (0, 1)) -> Iterator[bytes]:
+    """
+    Pump an unbounded input through a filter chain, yielding output lines
+    as they arrive.
+
+    Parameters
+    ----------
+    source   : an iterator of items holding one or more whole lines (a missing
+               final newline is added; big newline-aligned blocks give the
+               best throughput, one write() each), or a readable file object
+               / pipe with fileno(), e.g. `tail -F`'s stdout or sys.stdin.
+               A pipe, socket or terminal is watched by the selector itself,
+               so output keeps flowing while it is idle; its blocking mode is
+               restored at the end. A regular file cannot be polled and is
+               read with blocking reads, like an iterator. An iterator is only
+               pulled when a chain can take more, and a blocking next() holds
+               everything up until it returns.
+    commands : one argv, or a list of argvs forming a chain (grep | cut ...).
+               Filters must flush per line (grep --line-buffered, stdbuf -oL)
+               for output to arrive while input is still flowing.
+    workers  : N identical chains. Each item goes to whichever chain can take
+               it first, so output order across chains is not preserved.
+    ok_codes : exit codes that are not errors (grep exits 1 on no match).
+               Filters before the last one may also die of SIGPIPE.
+
+    Raises subprocess.CalledProcessError if a filter exits with another code.
+
+    Why a selector instead of communicate()?
+    ----------------------------------------
+    communicate() needs the whole input up front and returns the whole output
+    at the end. Here input is taken only when a chain can accept it, output
+    is read the moment it is readable (before any new input is taken), and
+    no call ever blocks on one pipe while another could deadlock.
+
+    Space Complexity: O(workers × (largest item + READ_SIZE))
+    """
+    if commands and isinstance(commands[0], str):
+        commands = [commands]
+    chains: List[FilterChain] = []
+    selector = selectors.DefaultSelector()
+    from_fd = hasattr(source, "fileno")
+    source_fd = source.fileno() if from_fd else -1
+    source_blocking: Optional[bool] = None  # the fd's mode to restore
+    exhausted = False
+
+    def idle_chain() -> Optional[FilterChain]:
+        for chain in chains:
+            if chain.pending is None and not chain.stdin.closed:
+                return chain
+        return None
+
+    def hand_over(chain: FilterChain, item: bytes) -> None:
+        # fd mode only: iterator items are pulled by the chain itself
+        chain.pending = memoryview(item)
+        selector.register(chain.stdin, selectors.EVENT_WRITE, chain)
+        if idle_chain() is None and source in selector.get_map():
+            # Backpressure: stop reading the source until a chain frees up
+            selector.unregister(source)
+
+    def finish_input() -> None:
+        # Idle chains get EOF now, busy ones once their item is out
+        for chain in chains:
+            if chain.pending is None:
+                chain.close_input(selector)
+
+    try:
+        for _ in range(workers):
+            chains.append(FilterChain(commands))
+        for chain in chains:
+            selector.register(chain.stdout, selectors.EVENT_READ, chain)
+        if from_fd:
+            try:
+                selector.register(source, selectors.EVENT_READ, None)
+            except PermissionError:
+                # Regular files can't be polled (epoll: EPERM) and never
+                # block for long: read them with blocking reads instead
+                from_fd = False
+                source = read_blocks(source_fd)
+            else:
+                source_blocking = os.get_blocking(source_fd)
+                os.set_blocking(source_fd, False)
+                carry = b""
+        if not from_fd:
+            items = iter(source)
+            # Iterator mode: a writable stdin is the signal to pull the next item
+            for chain in chains:
+                selector.register(chain.stdin, selectors.EVENT_WRITE, chain)
+        open_outputs = len(chains)
+        while open_outputs:
+            # Reads first: drain output before taking on more input
+            events = sorted(selector.select(), key=lambda event: event[1] != selectors.EVENT_READ)
+            for key, _ in events:
+                chain = key.data
+                if chain is None:
+                    try:
+                        data = os.read(source_fd, READ_SIZE)
+                    except BlockingIOError:
+                        continue
+                    target = idle_chain()
+                    if target is None:
+                        # Every filter stopped reading (e.g. head -n): stop too
+                        exhausted = True
+                        selector.unregister(source)
+                        continue
+                    if not data:
+                        exhausted = True
+                        selector.unregister(source)
+                        if carry:
+                            hand_over(target, carry + b"\n")
+                        finish_input()
+                        continue
+                    data = carry + data
+                    cut = data.rfind(b"\n") + 1
+                    carry = data[cut:]
+                    if cut:
+                        hand_over(target, data[:cut])
+                    continue
+                if key.fileobj is chain.stdout:
+                    try:
+                        data = os.read(chain.stdout.fileno(), READ_SIZE)
+                    except BlockingIOError:
+                        continue
+                    if data:
+                        yield from chain.split_lines(data)
+                        continue
+                    # EOF: the last filter exited or closed its stdout
+                    selector.unregister(chain.stdout)
+                    open_outputs -= 1
+                    chain.close_input(selector)
+                    if chain.partial:
+                        yield chain.partial
+                        chain.partial = b""
+                    continue
+                if chain.stdin.closed:
+                    continue  # closed earlier in this same batch of events
+                if chain.pending is None:
+                    if exhausted:
+                        chain.close_input(selector)
+                        continue
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        finish_input()
+                        continue
+                    if isinstance(item, str):
+                        item = item.encode("utf-8")
+                    if not item.endswith(b"\n"):
+                        item += b"\n"
+                    chain.pending = memoryview(item)
+                try:
+                    written = os.write(chain.stdin.fileno(), chain.pending)
+                except BlockingIOError:
+                    continue
+                except BrokenPipeError:
+                    # The filter stopped reading (e.g. head -n); its item is dropped
+                    chain.close_input(selector)
+                    written = 0
+                if chain.pending is not None and written < len(chain.pending):
+                    chain.pending = chain.pending[written:]
+                    continue
+                chain.pending = None
+                if exhausted:
+                    chain.close_input(selector)
+                elif from_fd:
+                    if not chain.stdin.closed:
+                        selector.unregister(chain.stdin)
+                    if source not in selector.get_map() and idle_chain() is not None:
+                        selector.register(source, selectors.EVENT_READ, None)
+        for chain in chains:
+            chain.check(ok_codes)
+    finally:
+        selector.close()
+        if source_blocking is not None:
+            try:
+                os.set_blocking(source_fd, source_blocking)
+            except OSError:
+                pass  # the caller closed it already
+        for chain in chains:
+            if not chain.stdin.closed:
+                chain.stdin.close()
+            chain.stdout.close()
+            chain.kill()
+
+
+class MultiPatternMatcher:
+    """
+    Dozens of literal patterns matched in one pass over bytes.
+
+    One alternation regex, longest pattern first, so at any position the
+    longest matching pattern wins; every shorter pattern that matches there
+    is a prefix, hence a substring, of it. Each pattern's mask therefore
+    includes every pattern contained in it, and restarting the search one
+    byte after each match start visits every position where some pattern
+    begins: the mask of a line is the exact set of patterns occurring in it,
+    overlaps included.
+    """
+
+    def __init__(self, patterns: Sequence[Union[bytes, str]], ignore_case: bool = False):
+        self.patterns = [p.encode("utf-8") if isinstance(p, str) else p for p in patterns]
+        if not self.patterns or not all(self.patterns):
+            raise ValueError("need at least one non-empty pattern")
+        self.ignore_case = ignore_case
+        keys = [p.lower() for p in self.patterns] if ignore_case else self.patterns
+        self.masks: Dict[bytes, int] = {}
+        for key in keys:
+            self.masks[key] = sum(1 << i for i, other in enumerate(keys) if other in key)
+        ordered = sorted(self.masks, key=len, reverse=True)
+        self.regex = re.compile(b"|".join(re.escape(key) for key in ordered))
+
+    def scan(self, block: bytes) -> Iterator[Tuple[bytes, int]]:
+        """(line, pattern bitmask) for every line of block with at least one hit."""
+        text = block.lower() if self.ignore_case else block
+        search = self.regex.search
+        masks = self.masks
+        n = len(text)
+        pos = 0
+        while True:
+            m = search(text, pos)
+            if m is None:
+                return
+            start = text.rfind(b"\n", 0, m.start()) + 1
+            end = text.find(b"\n", m.end())
+            end = n if end == -1 else end + 1
+            mask = masks[m.group()]
+            # The rest of this line only: endpos keeps matches inside it
+            m = search(text, m.start() + 1, end)
+            while m is not None:
+                mask |= masks[m.group()]
+                m = search(text, m.start() + 1, end)
+            yield block[start:end], mask
+            pos = end
+
+    def names(self, mask: int) -> List[bytes]:
+        return [p for i, p in enumerate(self.patterns) if mask >> i & 1]
+
+
+def match_filter(source: Union[Iterable[Union[bytes, str]], IO],
+                 matcher: MultiPatternMatcher) -> Iterator[bytes]:
+    """
+    Drop-in for stream_filter(source, grep -F -e ... ): same inputs, yields
+    the lines containing any pattern, but in-process, with no pipes or fork.
+    """
+    items = read_blocks(source.fileno()) if hasattr(source, "fileno") else source
+    for item in items:
+        if isinstance(item, str):
+            item = item.encode("utf-8")
+        for line, _ in matcher.scan(item):
+            yield line if line.endswith(b"\n") else line + b"\n"
+
+
+def benchmark_matcher(stream_mb: int = 256, batches: int = 200, batch_lines: int = 100):
+    """
+    MultiPatternMatcher vs a grep subprocess on the same 30 patterns:
+    per-batch latency for small batches (one grep per batch, as in
+    monitor_grep), then throughput over a generated stream_mb stream.
+    """
+    keywords = ["ERROR", "CRITICAL", "timeout", "segmentation fault", "disk full", "denied",
+                "refused", "panic", "OOM", "killed"] + [f"kw{i:02d}" for i in range(20)]
+    matcher = MultiPatternMatcher(keywords)
+    grep_argv = ["grep", "-F"] + [arg for kw in keywords for arg in ("-e", kw)]
+    levels = [b"INFO", b"DEBUG", b"ERROR", b"WARNING"]
+
+    def make_lines(n: int, offset: int = 0) -> bytes:
+        return b"".join(b"%s: request id=%d path=/api/v1/items/%d took %dms\n"
+                        % (levels[i % 4], i, i % 1000, i % 500) for i in range(offset, offset + n))
+
+    print("\n" + "=" * 60)
+    print(f"IN-PROCESS MATCHER vs grep SUBPROCESS ({len(keywords)} patterns):")
+    print("=" * 60)
+    batch = make_lines(batch_lines)
+    for label, run in (("grep subprocess", lambda: subprocess.run(grep_argv, input=batch,
+                                                                       stdout=subprocess.PIPE).stdout),
+                       ("in-process", lambda: b"".join(match_filter([batch], matcher)))):
+        latencies = []
+        for _ in range(batches):
+            start = time.perf_counter()
+            run()
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"{batch_lines}-line batch, {label:<16}: median {latencies[len(latencies) // 2] * 1e3:.3f}ms "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.3f}ms")
+
+    block = make_lines(10000)
+
+    def stream() -> Iterator[bytes]:
+        for _ in range(stream_mb * (1 << 20) // len(block)):
+            yield block
+
+    for label, lines in (("grep subprocess", stream_filter(stream(), grep_argv)),
+                         ("in-process", match_filter(stream(), matcher))):
+        start = time.perf_counter()
+        matched = sum(1 for _ in lines)
+        elapsed = time.perf_counter() - start
+        print(f"{stream_mb}MB stream, {label:<16}: {matched} lines, {stream_mb / elapsed:.1f} MB/s")
+
+
+def monitor_grep_streaming(lines: int = 200000, workers: int = 0):
+    """
+    The monitor_grep filter over a generated, unbounded-style stream: lines
+    are produced on demand and never held in memory as a whole.
+    Compares one grep against one grep per CPU core.
+    """
+    levels = [b"ERROR", b"INFO", b"WARNING", b"DEBUG"]
+
+    def log_stream(n: int) -> Iterator[bytes]:
+        # Blocks of 256 lines: one write() per block instead of per line
+        block = []
+        for i in range(n):
+            block.append(b"%s: event id=%d in module core.so\n" % (levels[i % 4], i))
+            if len(block) == 256:
+                yield b"".join(block)
+                block = []
+        if block:
+            yield b"".join(block)
+
+    print("\n" + "=" * 60)
+    print("STREAMING PIPELINE (selectors + non-blocking pipes):")
+    print("=" * 60)
+    for n_workers in sorted({1, workers or os.cpu_count() or 1}):
+        start = time.perf_counter()
+        matched = sum(1 for _ in stream_filter(log_stream(lines), ("grep", "ERROR"), n_workers))
+        elapsed = time.perf_counter() - start
+        print(f"{n_workers} grep process(es): {matched} ERROR lines of {lines} "
+              f"in {elapsed:.2f}s ({lines / elapsed:,.0f} lines/s)")
+
+
 def explain_deadlock_scenario():
     """
     Educational: Why manual I/O is dangerous.
@@ -148,5 +587,9 @@ def explain_deadlock_scenario():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--match-bench":
+        benchmark_matcher(int(sys.argv[2]) if len(sys.argv) > 2 else 256)
+        sys.exit(0)
     monitor_grep()
+    monitor_grep_streaming()
     explain_deadlock_scenario()
\ No newline at end of file
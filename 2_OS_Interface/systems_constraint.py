@@ -1,19 +1,223 @@
+import os
 import signal
 import time
 import sys
+import resource
+import selectors
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Set
 
-# Handler for SIGINT
-def signal_handler(sig, frame):
-    print("Cleaning up...")
-    sys.exit(0)
+# Event-driven worker: instead of waking up every second to check for a
+# signal, the loop blocks in select() until there is real work or a signal.
+# signal.set_wakeup_fd makes the C-level signal handler write the signal
+# number to a pipe the selector watches, so a signal ends the wait at once.
+# On SIGINT/SIGTERM new work stops being accepted and in-flight work gets
+# until a deadline to finish; a second signal skips the wait.
 
-# Register the signal handler
-signal.signal(signal.SIGINT, signal_handler)
+DRAIN_DEADLINE = 5.0
+DONE = b"\0"  # written by finished jobs; no signal has number 0
 
-# Infinite loop doing "work"
-try:
+
+class EventLoop:
+    def __init__(self, workers: int = 4, drain_deadline: float = DRAIN_DEADLINE):
+        self.selector = selectors.DefaultSelector()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.in_flight: Set[Future] = set()
+        self.drain_deadline = drain_deadline
+        self.stop_at: Optional[float] = None
+        self.forced = False
+        self.wakeups = 0
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._on_wakeup)
+
+    def install_signal_handlers(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # The Python-level handler does nothing; the byte on the wakeup
+            # pipe is what the loop reacts to (and no KeyboardInterrupt)
+            signal.signal(sig, lambda signum, frame: None)
+        signal.set_wakeup_fd(self._wake_w, warn_on_full_buffer=False)
+
+    def add_reader(self, fileobj, callback: Callable) -> None:
+        self.selector.register(fileobj, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fileobj) -> None:
+        self.selector.unregister(fileobj)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        future = self.executor.submit(fn, *args)
+        self.in_flight.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        # Runs in the worker thread: hand over to the loop through the pipe
+        try:
+            os.write(self._wake_w, DONE)
+        except BlockingIOError:
+            pass  # pipe full: the loop is already due to wake up
+
+    def _on_wakeup(self, fd: int) -> None:
+        try:
+            data = os.read(fd, 512)
+        except BlockingIOError:
+            return
+        self.in_flight = {f for f in self.in_flight if not f.done()}
+        for signum in data:
+            if signum in (signal.SIGINT, signal.SIGTERM):
+                self.shutdown(signum)
+
+    def shutdown(self, signum: int = signal.SIGTERM) -> None:
+        if self.stop_at is not None:
+            print("Second signal: not waiting for in-flight work", flush=True)
+            self.forced = True
+            return
+        print(f"Cleaning up... ({signal.Signals(signum).name}, {len(self.in_flight)} job(s) in flight)",
+              flush=True)
+        self.stop_at = time.monotonic() + self.drain_deadline
+        # Stop accepting work: only the wakeup pipe stays registered
+        for key in list(self.selector.get_map().values()):
+            if key.fileobj != self._wake_r:
+                self.selector.unregister(key.fileobj)
+
+    def run(self) -> int:
+        """Serve until a signal; returns how many jobs had to be abandoned."""
+        while True:
+            timeout = None  # idle: block until work or a signal
+            if self.stop_at is not None:
+                timeout = self.stop_at - time.monotonic()
+                if not self.in_flight or timeout <= 0 or self.forced:
+                    return len(self.in_flight)
+            events = self.selector.select(timeout)
+            self.wakeups += 1
+            for key, _ in events:
+                key.data(key.fileobj)
+
+
+def serve(drain_deadline: float = DRAIN_DEADLINE) -> int:
+    """
+    Each stdin line is a job: sleep that many seconds in a worker thread.
+    Exit stats go to stdout for the benchmark to read.
+    """
+    loop = EventLoop(drain_deadline=drain_deadline)
+    loop.install_signal_handlers()
+    carry = b""
+
+    def read_jobs(fd: int) -> bool:
+        """Submit the complete lines of one read; False at EOF."""
+        nonlocal carry
+        data = os.read(fd, 4096)
+        if not data:
+            data = b"\n" if carry else b""  # a last line without newline
+        *lines, carry = (carry + data).split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                seconds = float(line)
+            except ValueError:
+                seconds = -1.0
+            if not 0 <= seconds < float("inf"):
+                print(f"Rejected job {line.decode(errors='replace')!r}: expected seconds >= 0", flush=True)
+                continue
+            loop.submit(time.sleep, seconds)
+        return bool(data)
+
+    def on_stdin(fd: int) -> None:
+        if not read_jobs(fd):
+            loop.remove_reader(fd)  # no more jobs, but keep serving signals
+
+    try:
+        loop.add_reader(sys.stdin.fileno(), on_stdin)
+    except PermissionError:
+        # epoll can't watch /dev/null or a regular file (nohup, systemd, `&`),
+        # but reading them never blocks: take all their jobs right away
+        while read_jobs(sys.stdin.fileno()):
+            pass
+    start = time.monotonic()
+    print("ready", flush=True)
+    abandoned = loop.run()
+    elapsed = time.monotonic() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    print(f"loop wakeups: {loop.wakeups} in {elapsed:.2f}s, voluntary context switches: {usage.ru_nvcsw}",
+          flush=True)
+    if abandoned:
+        print(f"Deadline hit: abandoning {abandoned} job(s)", flush=True)
+        os._exit(1)  # worker threads are not daemons; don't wait for them
+    loop.executor.shutdown()
+    return 0
+
+
+def legacy_loop() -> int:
+    """The original worker: wake up every second to notice a signal."""
+    wakeups = 0
+    start = time.monotonic()
+
+    # Handler for SIGINT
+    def signal_handler(sig, frame):
+        print("Cleaning up...")
+        print(f"loop wakeups: {wakeups} in {time.monotonic() - start:.2f}s", flush=True)
+        sys.exit(0)
+
+    # Register the signal handler
+    signal.signal(signal.SIGINT, signal_handler)
+    print("ready", flush=True)
+
+    # Infinite loop doing "work"
     while True:
         time.sleep(1)  # Simulating work by sleeping
-except KeyboardInterrupt:
-    # This block is not necessary since we handle SIGINT with the signal handler
-    pass
+        wakeups += 1
+
+
+def measure_shutdown(argv: List[str], jobs: bytes = b"", idle: float = 2.0) -> float:
+    """Start a worker, let it idle, send SIGINT; seconds until it has exited."""
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)] + argv,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    proc.stdout.readline()  # "ready"
+    if jobs:
+        proc.stdin.write(jobs)
+        proc.stdin.flush()
+    time.sleep(idle)
+    start = time.perf_counter()
+    proc.send_signal(signal.SIGINT)
+    output = proc.stdout.read().decode()
+    proc.wait()
+    elapsed = time.perf_counter() - start
+    proc.stdin.close()
+    proc.stdout.close()
+    stats = [line for line in output.splitlines() if line.startswith("loop wakeups")]
+    print(f"    {stats[0] if stats else output.strip()}  (exit {proc.returncode})")
+    return elapsed
+
+
+def benchmark(trials: int = 3) -> None:
+    """Shutdown latency and idle wakeups: sleep loop vs event loop."""
+    cases = [
+        ("sleep(1) loop, idle", ["--legacy"], b""),
+        ("event loop, idle", [], b""),
+        ("event loop, 0.5s job in flight", [], b"2.5\n"),  # ~0.5s left when SIGINT lands
+        ("event loop, job past 0.3s deadline", ["--deadline", "0.3"], b"10\n"),
+    ]
+    for label, argv, jobs in cases:
+        print(f"{label}:")
+        latencies = sorted(measure_shutdown(argv, jobs) for _ in range(trials))
+        print(f"  shutdown latency: median {latencies[len(latencies) // 2] * 1e3:.1f}ms, "
+              f"max {latencies[-1] * 1e3:.1f}ms")
+
+
+def main(argv: List[str]) -> int:
+    if "--benchmark" in argv:
+        benchmark()
+        return 0
+    if "--legacy" in argv:
+        return legacy_loop()
+    deadline = DRAIN_DEADLINE
+    if "--deadline" in argv:
+        deadline = float(argv[argv.index("--deadline") + 1])
+    return serve(deadline)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,15 @@
+import os
 import sys
-from typing import List
+import time
+import random
+from array import array
+from typing import Iterable, Iterator, List, Optional, Union
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # the bytes-scan path works without it
+    np = None
 
 """
 Day 3: String to Integer (atoi) via DFA
@@ -7,6 +17,16 @@ Constraints:
 - Do NOT use int(); perform ASCII arithmetic
 - Detect overflow before it happens; clamp to 32-bit signed range
 - Implement as a deterministic finite automaton (Start -> Sign -> Digit -> End)
+- Batch mode: a buffer of sep-delimited numbers -> array('i') (or an int32
+  NumPy array), each field with the same atoi semantics and clamping.
+  Pure Python: each DFA stage is one C-level bytes scan and digits are
+  valued through a precomputed 4-digit table. NumPy: the stages run for
+  all fields at once and the digit runs are valued with one place-value
+  dot product, with no per-byte Python code at all
+- Streaming mode: the same automaton as a precomputed byte -> next-state
+  table whose state (and partial value) survives between chunks, so a
+  sign or a digit run split across two os.read calls still parses as one
+  number; no lines are ever built
 """
 
 INT_MIN = -(2**31)
@@ -57,7 +77,8 @@ def atoi_dfa(s: str) -> int:
                     if acc > (INT_MAX - d) // 10:
                         return INT_MAX
                 else:
-                    if -acc < (INT_MIN + d) // 10:  # rearranged to avoid int()
+                    # acc*10 + d > -INT_MIN, rearranged to avoid int() and overflow
+                    if acc > (-INT_MIN - d) // 10:
                         return INT_MIN
                 acc = acc * 10 + d
                 i += 1
@@ -70,10 +91,260 @@ def atoi_dfa(s: str) -> int:
     return sign * acc
 
 
+# Magnitudes saturate here: -LIMIT is INT_MIN, and +LIMIT clamps to INT_MAX
+LIMIT = 2**31
+DIGITS = b"0123456789"
+# 4-digit string -> value: the digit arithmetic done once, ahead of time
+GROUPS = {b"%04d" % v: v for v in range(10000)}
+WINDOW = 1 << 20  # bytes per vectorized pass; bounds the temporaries
+SKIP_STEPS = 8
+if np is not None:
+    PLACE_VALUES = np.array([10 ** k for k in range(9, -1, -1)], dtype=np.int64)
+
+
+def atoi_field(field: bytes) -> int:
+    """
+    atoi_dfa over bytes, one DFA stage per C-level scan: lstrip(' ') is the
+    START loop, one sign byte is SIGN, lstrip(DIGITS) finds the DIGIT run.
+    The run is valued 4 digits at a time through GROUPS.
+    """
+    f = field.lstrip(b" ")
+    neg = f[:1] == b"-"
+    if neg or f[:1] == b"+":
+        f = f[1:]
+    run = f[:len(f) - len(f.lstrip(DIGITS))].lstrip(b"0")
+    if len(run) > 10:
+        mag = LIMIT
+    else:
+        run = run.rjust(12, b"0")
+        mag = min(GROUPS[run[:4]] * 100000000 + GROUPS[run[4:8]] * 10000 + GROUPS[run[8:]], LIMIT)
+    return -mag if neg else min(mag, INT_MAX)
+
+
+def parse_ints_fields(buf, sep: bytes = b"\n") -> array:
+    data = bytes(buf)
+    fields = data.split(sep)
+    if data.endswith(sep) or not data:
+        fields.pop()
+    return array('i', map(atoi_field, fields))
+
+
+def _skip(a, pos, byte: int):
+    """Move each position past a run of `byte`. Runs are rare and short, so
+    step the few affected positions; past SKIP_STEPS, jump with a search."""
+    pos = pos.copy()
+    idx = np.flatnonzero(a[pos] == byte)
+    for _ in range(SKIP_STEPS):
+        if not len(idx):
+            return pos
+        pos[idx] += 1
+        idx = idx[a[pos[idx]] == byte]
+    if len(idx):
+        other = np.flatnonzero(a != byte)
+        pos[idx] = other[np.searchsorted(other, pos[idx])]
+    return pos
+
+
+def _parse_window(a, delim: int):
+    """Fields of `a` (uint8, ends with delim) -> int32 values, all fields at once."""
+    ends = np.flatnonzero(a == delim)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # START: skip leading spaces (the delimiter always stops the scan)
+    pos = _skip(a, starts, 32)
+    lead = a[pos]
+    neg = lead == 45
+    # SIGN: at most one sign byte
+    pos = pos + ((lead == 45) | (lead == 43))
+    # DIGIT: leading zeros don't count; the run ends at the next non-digit
+    first = _skip(a, pos, 48)
+    nondigit = np.flatnonzero(a - 48 > 9)  # uint8 wraparound: one compare
+    end = nondigit[np.searchsorted(nondigit, first)]
+    ndigits = end - first
+    # The 10 bytes before each run's end, as one strided gather; bytes
+    # ahead of the run are masked out, the rest weighted by place value
+    padded = np.concatenate((np.full(10, delim, dtype=np.uint8), a))
+    tails = sliding_window_view(padded, 10)[end]
+    keep = np.arange(10) >= (10 - np.minimum(ndigits, 10))[:, None]
+    mag = np.minimum(((tails - 48) * keep) @ PLACE_VALUES, LIMIT)
+    mag[ndigits > 10] = LIMIT
+    return np.where(neg, -mag, np.minimum(mag, INT_MAX)).astype(np.int32)
+
+
+def parse_ints_numpy(buf, sep: bytes = b"\n"):
+    delim = sep[0]
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if len(data) and data[-1] != delim:
+        # Terminate the last field (one copy, only for unterminated input)
+        data = np.concatenate([data, np.array([delim], dtype=np.uint8)])
+    parts = [np.zeros(0, dtype=np.int32)]  # concatenate() needs at least one
+    pos = 0
+    while pos < len(data):
+        # Cut after the window's last delimiter, or after the next one when
+        # a single field is longer than the window
+        stop = min(pos + WINDOW, len(data))
+        ends = np.flatnonzero(data[pos:stop] == delim)
+        if len(ends):
+            stop = pos + int(ends[-1]) + 1
+        else:
+            stop += int(np.flatnonzero(data[stop:] == delim)[0]) + 1
+        parts.append(_parse_window(data[pos:stop], delim))
+        pos = stop
+    return np.concatenate(parts)
+
+
+def parse_ints(buf, sep: bytes = b"\n", vectorized: Optional[bool] = None) -> Union[array, "np.ndarray"]:
+    """
+    Parse every sep-delimited field of a bytes-like buffer as atoi_dfa would
+    (leading spaces, one sign, digits up to the first other byte, clamped to
+    32 bits; a field without digits is 0). A trailing sep does not start an
+    extra field. Returns an int32 NumPy array when vectorized (the default
+    when NumPy is installed), else array('i').
+    """
+    if len(sep) != 1 or sep in b" +-0123456789":
+        raise ValueError("sep must be one byte other than a space, sign or digit")
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized:
+        if np is None:
+            raise RuntimeError("vectorized parsing needs NumPy")
+        return parse_ints_numpy(buf, sep)
+    return parse_ints_fields(buf, sep)
+
+
+class StreamState:
+    """
+    States of the streaming automaton. The sign is part of the state, and
+    EMIT flags the transitions that end a digit run (the number is output
+    on that edge), so table[state][byte] is all feed() needs.
+    """
+    START = 0
+    PLUS = 1
+    MINUS = 2
+    DIGITS = 3
+    NEG_DIGITS = 4
+    EMIT = 8
+    MASK = 7
+
+
+def build_stream_table() -> List[bytes]:
+    """
+    STREAM_TABLE[state][byte] -> next state (| EMIT). Unlike atoi_dfa there
+    is no END: a number is a sign-optional digit run, anything else
+    separates numbers, and a sign right after a digit run (or another sign)
+    starts the next number.
+    """
+    S = StreamState
+    table = []
+    for state in (S.START, S.PLUS, S.MINUS, S.DIGITS, S.NEG_DIGITS):
+        in_run = state in (S.DIGITS, S.NEG_DIGITS)
+        emit = S.EMIT if in_run else 0
+        row = bytearray([S.START | emit]) * 256
+        row[ord('+')] = S.PLUS | emit
+        row[ord('-')] = S.MINUS | emit
+        # Digits keep a run's sign; after START or PLUS the run is positive
+        digits = S.NEG_DIGITS if state in (S.MINUS, S.NEG_DIGITS) else S.DIGITS
+        for b in DIGITS:
+            row[b] = digits
+        table.append(bytes(row))
+    return table
+
+
+STREAM_TABLE = build_stream_table()
+
+
+class IntTokenizer:
+    """Resumable atoi DFA over a byte stream; feed() chunks, close() at EOF."""
+
+    def __init__(self) -> None:
+        self.state = StreamState.START
+        self.acc = 0
+
+    def feed(self, chunk) -> List[int]:
+        """Numbers completed by this chunk; a run reaching its end stays pending."""
+        out: List[int] = []
+        table = STREAM_TABLE
+        # Locals: attribute lookups would dominate this per-byte loop
+        emit, mask, digits, neg = StreamState.EMIT, StreamState.MASK, StreamState.DIGITS, StreamState.NEG_DIGITS
+        state, acc = self.state, self.acc
+        for b in bytes(chunk):
+            nxt = table[state][b]
+            if nxt & emit:
+                out.append(-acc if state == neg else min(acc, INT_MAX))
+                acc = 0
+                nxt &= mask
+            elif nxt >= digits:
+                acc = acc * 10 + b - 48
+                if acc > LIMIT:
+                    acc = LIMIT  # saturate: more digits can't bring it back in range
+            state = nxt
+        self.state, self.acc = state, acc
+        return out
+
+    def close(self) -> List[int]:
+        """Flush a number the stream ended in, and reset for reuse."""
+        out = []
+        if self.state == StreamState.DIGITS:
+            out.append(min(self.acc, INT_MAX))
+        elif self.state == StreamState.NEG_DIGITS:
+            out.append(-self.acc)
+        self.__init__()
+        return out
+
+
+def iter_ints(chunks: Iterable[bytes]) -> Iterator[int]:
+    tokenizer = IntTokenizer()
+    for chunk in chunks:
+        yield from tokenizer.feed(chunk)
+    yield from tokenizer.close()
+
+
+def iter_ints_fd(fd: int, buf_size: int = 65536) -> Iterator[int]:
+    """Numbers read straight off a file descriptor, buf_size bytes per os.read."""
+    def chunks() -> Iterator[bytes]:
+        while True:
+            chunk = os.read(fd, buf_size)
+            if not chunk:
+                return
+            yield chunk
+    return iter_ints(chunks())
+
+
+def benchmark(n: int = 1000000, seed: int = 1) -> None:
+    """Values per second per engine on mixed input, checked against atoi_dfa."""
+    rng = random.Random(seed)
+    fields = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.8:
+            fields.append(str(rng.randrange(0, 100000)))
+        elif kind < 0.9:
+            fields.append(f"  {rng.choice('+-')}{rng.randrange(0, 2**31)}")
+        elif kind < 0.95:
+            fields.append(f"-{rng.randrange(2**31, 10**12)}x")
+        else:
+            fields.append(rng.choice(["", "abc", "-", "007", " +0", "99999999999999999999"]))
+    buf = "\n".join(fields).encode("ascii") + b"\n"
+    expected = [atoi_dfa(f) for f in fields]
+    engines = [("bytes scans", False)] + ([("numpy", True)] if np is not None else [])
+    for name, vectorized in engines:
+        start = time.perf_counter()
+        values = parse_ints(buf, vectorized=vectorized)
+        elapsed = time.perf_counter() - start
+        ok = list(values) == expected
+        print(f"{name}: {n / elapsed / 1e6:.1f}M values/s, {len(buf) / elapsed / (1 << 20):.0f} MB/s"
+              f"{'' if ok else '  MISMATCH'}")
+    if np is None:
+        print("numpy: not installed")
+
+
 def main(argv: List[str]) -> int:
     if len(argv) < 2:
         print("Usage: python3 Day3_atoi_dfa.py \"   -42  \"")
+        print("       python3 Day3_atoi_dfa.py --batch-bench [N]")
         return 2
+    if argv[1] == "--batch-bench":
+        benchmark(atoi_dfa(argv[2]) if len(argv) > 2 else 1000000)
+        return 0
     s = argv[1]
     print(atoi_dfa(s))
     return 0
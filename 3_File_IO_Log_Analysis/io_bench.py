@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import statistics
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+"""
+Benchmark harness shared by the file-I/O tools in this directory.
+Constraints:
+- Untimed warmup runs, then repeated trials timed with perf_counter_ns
+- Results are distributions, not single runs: median, p95, mean, stddev
+- Page-cache state is chosen, not inherited: "cold" evicts the input files
+  with posix_fadvise(DONTNEED) before every run, "warm" reads them in
+  during warmup and keeps them cached
+- Syscalls are counted in one extra untimed run, so counting never slows
+  down a timed trial: calls through the os module by wrapping its functions,
+  and read/write-family syscalls of any origin (buffered files, C
+  extensions) from the syscr/syscw deltas of /proc/self/io
+- A count that cannot be observed is reported as null, never as 0
+- Reports are plain JSON
+"""
+
+CACHE_MODES = ("warm", "cold")
+# os functions that map 1:1 to a syscall the copy/parse loops issue
+SYSCALLS = ("read", "readv", "pread", "preadv", "write", "writev", "pwrite", "pwritev",
+            "copy_file_range", "sendfile", "splice", "lseek", "open", "close",
+            "fstat", "ftruncate", "posix_fallocate", "posix_fadvise")
+
+
+def drop_cache(path: str) -> None:
+    """Evict a file's pages from the page cache (dirty pages are flushed first)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)  # DONTNEED leaves dirty pages in place
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+class SyscallCounter:
+    """
+    Context manager that replaces the os functions in SYSCALLS with counting
+    wrappers. Only calls made through the os module are seen: mmap page
+    faults, buffered file objects and C extensions are invisible to it.
+    """
+
+    def __init__(self, names: Iterable[str] = SYSCALLS) -> None:
+        self.names = [name for name in names if hasattr(os, name)]
+        self.counts: Counter = Counter()
+        self._saved: Dict[str, Callable] = {}
+        self._lock = threading.Lock()  # the copy backends call os from several threads
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            with self._lock:
+                self.counts[name] += 1
+            return func(*args, **kwargs)
+        return counted
+
+    def __enter__(self) -> "SyscallCounter":
+        for name in self.names:
+            self._saved[name] = getattr(os, name)
+            setattr(os, name, self._wrap(name, self._saved[name]))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for name, func in self._saved.items():
+            setattr(os, name, func)
+        self._saved.clear()
+
+
+def read_proc_io() -> Optional[Tuple[int, int]]:
+    """(syscr, syscw) of this process from /proc/self/io, or None where unavailable."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            fields = dict(line.split(b":", 1) for line in f.read().splitlines())
+        return int(fields[b"syscr"]), int(fields[b"syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def summarize(samples_ns: List[int]) -> Dict[str, float]:
+    """Seconds: median, p95 (nearest rank), mean, stddev (0 for one sample), min, max."""
+    ordered = sorted(samples_ns)
+    p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        "median_s": statistics.median(ordered) / 1e9,
+        "p95_s": p95 / 1e9,
+        "mean_s": statistics.fmean(ordered) / 1e9,
+        "stddev_s": statistics.stdev(ordered) / 1e9 if len(ordered) > 1 else 0.0,
+        "min_s": ordered[0] / 1e9,
+        "max_s": ordered[-1] / 1e9,
+    }
+
+
+def measure(fn: Callable[[], object], trials: int = 5, warmup: int = 1, cache: str = "warm",
+            paths: Iterable[str] = (), setup: Optional[Callable[[], object]] = None,
+            teardown: Optional[Callable[[], object]] = None) -> dict:
+    """
+    Run fn() warmup times untimed, once more under a SyscallCounter and
+    /proc/self/io, then `trials` timed times. setup/teardown run around
+    every call, untimed. With cache="cold", every file in `paths` is
+    evicted before each call. syscalls_total counts calls through the os
+    module and is None when fn made none (mmap, buffered files, NumPy: the
+    wrappers cannot see them); rw_syscalls is the /proc/self/io delta.
+    """
+    if cache not in CACHE_MODES:
+        raise ValueError(f"unknown cache mode {cache!r}, expected one of {CACHE_MODES}")
+    if trials < 1:
+        raise ValueError("trials must be >= 1")
+    paths = list(paths)
+    proc_io: List[int] = []
+
+    def run(counter: Optional[SyscallCounter] = None) -> int:
+        if setup:
+            setup()
+        if cache == "cold":
+            for path in paths:
+                drop_cache(path)
+        try:
+            if counter is not None:
+                before = read_proc_io()
+                with counter:
+                    fn()
+                after = read_proc_io()
+                if before is not None and after is not None:
+                    proc_io.extend(a - b for a, b in zip(after, before))
+                return 0
+            start = time.perf_counter_ns()
+            fn()
+            return time.perf_counter_ns() - start
+        finally:
+            if teardown:
+                teardown()
+
+    for _ in range(warmup):
+        run()
+    counter = SyscallCounter()
+    run(counter)
+    samples = [run() for _ in range(trials)]
+    result = {"cache": cache, "trials": trials, "warmup": warmup}
+    result.update(summarize(samples))
+    result["syscalls"] = dict(sorted(counter.counts.items()))
+    result["syscalls_total"] = sum(counter.counts.values()) or None
+    result["rw_syscalls"] = sum(proc_io) if proc_io else None
+    return result
+
+
+def add_arguments(parser: argparse.ArgumentParser, trials: int = 5) -> None:
+    """The --trials/--warmup/--cache/--json flags, same meaning in every tool."""
+    parser.add_argument("--trials", type=int, default=trials, help="timed runs per configuration")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before the trials")
+    parser.add_argument("--cache", choices=CACHE_MODES + ("both",), default="warm",
+                        help="page-cache state: warm, cold (posix_fadvise DONTNEED) or both")
+    parser.add_argument("--json", metavar="PATH", help="also write the full JSON report here")
+
+
+def cache_modes(choice: str) -> List[str]:
+    return list(CACHE_MODES) if choice == "both" else [choice]
+
+
+def format_result(label: str, result: dict) -> str:
+    if "error" in result:
+        return f"{label}: {result['error']}"
+    counts = []
+    if result["syscalls_total"] is not None:
+        counts.append(f"{result['syscalls_total']} syscalls via os")
+    if result["rw_syscalls"] is not None:
+        counts.append(f"{result['rw_syscalls']} read/write syscalls")
+    return (f"{label}: median {result['median_s']:.4f}s p95 {result['p95_s']:.4f}s "
+            f"stddev {result['stddev_s']:.4f}s ({', '.join(counts) or 'syscalls not observable'})")
+
+
+def write_report(path: Optional[str], tool: str, results: List[dict], **context) -> None:
+    """JSON report with machine context; to stdout when path is None."""
+    report = {
+        "tool": tool,
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        **context,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if path is None:
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
@@ -0,0 +1,242 @@
+import os
+import sys
+import time
+import heapq
+import random
+import argparse
+import ipaddress
+import importlib.util
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from top_ips_heap import block_stream, count_block, load_numpy, pack_ipv4
+
+"""
+Classify client IPs against large CIDR tables (blocklists, ASN ranges).
+Constraints:
+- No linear scan per IP: CIDRs become integer intervals, overlapping ones
+  are collapsed with the LC 56 merge from 1_Algorithmic_Patterns, and the
+  result is flattened into sorted, non-overlapping segments
+- A lookup is one binary search (bisect, or numpy.searchsorted in bulk)
+- Each segment is labelled with every category covering it, so an IP can
+  be both "tor" and "AS13335"
+- Log IPs are classified once per distinct token, not once per line
+"""
+
+ALGO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "1_Algorithmic_Patterns")
+
+Labels = Tuple[str, ...]
+NO_LABELS: Labels = ()
+
+
+def load_interval_merger():
+    """Solution.merge from Merge_Intervals.py (its directory name is not importable)."""
+    spec = importlib.util.spec_from_file_location(
+        "Merge_Intervals", os.path.join(ALGO_DIR, "Merge_Intervals.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Solution()
+
+
+def cidr_interval(text: str) -> Tuple[int, List[int]]:
+    """'10.0.0.0/8' -> (4, [start, end)) with end exclusive."""
+    addr, _, prefix = text.partition("/")
+    value = pack_ipv4(addr.encode('ascii', errors='replace'))
+    if value >= 0 and (not prefix or prefix.isdigit() and int(prefix) <= 32):
+        # IPv4 fast path: ip_network costs ~30us, most of a large table's load time
+        host_bits = 32 - int(prefix or 32)
+        start = value >> host_bits << host_bits
+        return 4, [start, start + (1 << host_bits)]
+    net = ipaddress.ip_network(text, strict=False)
+    start = int(net.network_address)
+    return net.version, [start, start + net.num_addresses]
+
+
+class RangeIndex:
+    """
+    Sorted, non-overlapping [start, end) segments with their category labels.
+    One index per address family, since IPv4 and IPv6 integers overlap.
+    """
+
+    def __init__(self, starts: List[int], ends: List[int], labels: List[Labels]) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.labels = labels
+
+    @classmethod
+    def build(cls, categories: Dict[str, List[List[int]]]) -> "RangeIndex":
+        merger = load_interval_merger()
+        # Half-open intervals: the LC 56 test `next.start <= last.end` then
+        # also joins blocks that merely touch, e.g. two adjacent /25s
+        events: List[Tuple[int, int, str]] = []
+        for category, intervals in categories.items():
+            for start, end in merger.merge([list(iv) for iv in intervals]):
+                events.append((start, 1, category))
+                events.append((end, -1, category))
+        events.sort()
+        starts: List[int] = []
+        ends: List[int] = []
+        labels: List[Labels] = []
+        active: Counter = Counter()
+        interned: Dict[Labels, Labels] = {}
+        current: Labels = NO_LABELS
+        since = 0
+        i = 0
+        # Sweep the boundaries; between two boundaries the covering set is constant
+        while i < len(events):
+            point = events[i][0]
+            if current and point > since:
+                if ends and ends[-1] == since and labels[-1] == current:
+                    ends[-1] = point  # same categories continue: extend
+                else:
+                    starts.append(since)
+                    ends.append(point)
+                    labels.append(current)
+            while i < len(events) and events[i][0] == point:
+                _, delta, category = events[i]
+                active[category] += delta
+                if not active[category]:
+                    del active[category]
+                i += 1
+            label = tuple(sorted(active))
+            current = interned.setdefault(label, label)
+            since = point
+        return cls(starts, ends, labels)
+
+    def lookup(self, value: int) -> Labels:
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value < self.ends[i]:
+            return self.labels[i]
+        return NO_LABELS
+
+    def lookup_many(self, values: List[int]) -> List[Labels]:
+        """Bulk lookup; one vectorized searchsorted when NumPy is available."""
+        np = load_numpy()
+        if np is None or not self.starts or self.ends[-1] > 1 << 63:
+            return [self.lookup(v) for v in values]
+        starts = np.asarray(self.starts, dtype=np.int64)
+        ends = np.asarray(self.ends, dtype=np.int64)
+        vals = np.asarray(values, dtype=np.int64)
+        idx = np.searchsorted(starts, vals, side='right') - 1
+        hit = (idx >= 0) & (vals < ends[np.maximum(idx, 0)])
+        labels = self.labels
+        return [labels[i] if h else NO_LABELS for i, h in zip(idx.tolist(), hit.tolist())]
+
+
+class IPClassifier:
+    """IPv4 and IPv6 RangeIndexes behind one token -> categories lookup."""
+
+    def __init__(self, v4: RangeIndex, v6: RangeIndex) -> None:
+        self.v4 = v4
+        self.v6 = v6
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> "IPClassifier":
+        """
+        Each line: '<cidr> [category]'; '#' starts a comment. Without a
+        category column, the file name (minus extension) is the category.
+        """
+        tables: Dict[int, Dict[str, List[List[int]]]] = {4: {}, 6: {}}
+        for path in paths:
+            default = os.path.splitext(os.path.basename(path))[0]
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    parts = line.split(None, 1)
+                    version, interval = cidr_interval(parts[0])
+                    category = parts[1].strip() if len(parts) > 1 else default
+                    tables[version].setdefault(category, []).append(interval)
+        return cls(RangeIndex.build(tables[4]), RangeIndex.build(tables[6]))
+
+    def classify(self, token: bytes) -> Labels:
+        value = pack_ipv4(token)
+        if value >= 0:
+            return self.v4.lookup(value)
+        try:
+            addr = ipaddress.ip_address(token.decode('ascii'))
+        except (UnicodeDecodeError, ValueError):
+            return NO_LABELS
+        index = self.v4 if addr.version == 4 else self.v6
+        return index.lookup(int(addr))
+
+    def classify_counts(self, counts: Dict[bytes, int]) -> Dict[str, Counter]:
+        """Per-category IP counters from a token -> hits counter."""
+        per_category: Dict[str, Counter] = {}
+        v4_tokens: List[bytes] = []
+        v4_values: List[int] = []
+        for token in counts:
+            value = pack_ipv4(token)
+            if value >= 0:
+                v4_tokens.append(token)
+                v4_values.append(value)
+                continue
+            for category in self.classify(token):
+                per_category.setdefault(category, Counter())[token] += counts[token]
+        for token, labels in zip(v4_tokens, self.v4.lookup_many(v4_values)):
+            for category in labels:
+                per_category.setdefault(category, Counter())[token] += counts[token]
+        return per_category
+
+
+def top_per_category(log_path: str, classifier: IPClassifier,
+                     k: int = 10) -> Dict[str, List[Tuple[str, int]]]:
+    counts: Counter = Counter()
+    for block in block_stream(log_path):
+        count_block(block, counts)
+    result = {}
+    for category, hits in classifier.classify_counts(counts).items():
+        top = heapq.nlargest(k, hits.items(), key=lambda kv: kv[1])
+        result[category] = [(ip.decode('utf-8', errors='ignore'), n) for ip, n in top]
+    return result
+
+
+def benchmark(classifier: IPClassifier, n: int = 1000000, seed: Optional[int] = 1) -> None:
+    """Lookups per second for random IPv4 addresses, scalar and bulk."""
+    rng = random.Random(seed)
+    values = [rng.getrandbits(32) for _ in range(n)]
+    start = time.perf_counter()
+    for v in values:
+        classifier.v4.lookup(v)
+    elapsed = time.perf_counter() - start
+    print(f"bisect lookup: {n / elapsed:,.0f} IPs/s")
+    start = time.perf_counter()
+    classifier.v4.lookup_many(values)
+    elapsed = time.perf_counter() - start
+    engine = "numpy.searchsorted" if load_numpy() is not None else "bisect (no NumPy)"
+    print(f"bulk lookup ({engine}): {n / elapsed:,.0f} IPs/s")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="ip_ranges.py",
+                                     description="Top client IPs per CIDR category")
+    parser.add_argument("log_path", nargs="?")
+    parser.add_argument("--ranges", action="append", required=True, metavar="FILE",
+                        help="CIDR table: '<cidr> [category]' per line (repeatable)")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="time N random lookups instead of reading a log")
+    args = parser.parse_args(argv[1:])
+
+    start = time.perf_counter()
+    classifier = IPClassifier.from_files(args.ranges)
+    segments = len(classifier.v4.starts) + len(classifier.v6.starts)
+    print(f"Built index: {segments} segments in {time.perf_counter() - start:.3f}s")
+    if args.benchmark:
+        benchmark(classifier, args.benchmark)
+        return 0
+    if not args.log_path or not os.path.isfile(args.log_path):
+        print(f"Error: File not found: {args.log_path}")
+        return 2
+
+    for category, top in sorted(top_per_category(args.log_path, classifier, args.k).items()):
+        print(f"\n[{category}]")
+        for rank, (ip, count) in enumerate(top, start=1):
+            print(f"{rank:2d}. {ip} -> {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import argparse
+from typing import List
+
+from top_ips_heap import MODES, benchmark_modes, compression_opener, count_lines
+
+"""
+Benchmark runner for the log analyzer engines.
+Constraints:
+- The runs are top_ips_heap.py --benchmark's (benchmark_modes): every
+  engine in its own child process, so peak RSS (from os.wait4) belongs to
+  that engine alone, with a private TMPDIR polled for peak temp-disk usage;
+  the parallel engine is run at 1, 2, 4, ... up to --workers
+- Results are emitted as JSON: lines/sec, MB/s, wall time, peak RSS and
+  peak temp-disk bytes per run
+"""
+
+
+def run_suite(log_path: str, modes: List[str], workers: int) -> dict:
+    """JSON report of top_ips_heap.benchmark_modes; its table goes to stderr."""
+    results = benchmark_modes(log_path, modes, workers, out=sys.stderr)
+    return {
+        "log_path": os.path.abspath(log_path),
+        "input_bytes": os.path.getsize(log_path),
+        "compressed": compression_opener(log_path) is not None,
+        "lines": count_lines(log_path),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="log_benchmark.py",
+                                     description="Benchmark log analyzer engines, report JSON")
+    parser.add_argument("log_path")
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"comma-separated engines (default: {','.join(MODES)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv[1:])
+    if not os.path.isfile(args.log_path):
+        print(f"Error: File not found: {args.log_path}")
+        return 2
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        print(f"Error: unknown engine(s): {', '.join(unknown)}")
+        return 2
+
+    report = run_suite(args.log_path, modes, args.workers)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
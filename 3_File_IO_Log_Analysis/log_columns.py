@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import mmap
+import time
+import heapq
+import struct
+import argparse
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import io_bench
+from top_ips_heap import block_stream, parse_clf_block
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback over memoryview columns
+    np = None
+
+"""
+Columnar cache for parsed access logs.
+Constraints:
+- Parse the text log once; later queries never touch the text again
+- One typed column per CLF field: ip, ts, method, path, status, size
+- Strings (ip, method, path) are dictionary-encoded to uint32 codes
+- Columns are written as raw little-endian arrays and memory-mapped on load
+  (memoryview.cast, or numpy.frombuffer when NumPy is installed: zero copy)
+- While building, rows are flushed to per-column spill files every
+  FLUSH_ROWS so memory stays bounded by the dictionaries, not the row count
+
+File layout:
+    MAGIC | u64 header length | JSON header | padding | column data...
+Every column starts on an 8-byte boundary so the mapped views are aligned.
+"""
+
+MAGIC = b"CLFCOL1\n"
+ALIGN = 8
+FLUSH_ROWS = 1 << 20
+
+# name -> array typecode; dictionary-encoded columns hold codes
+COLUMNS = {
+    "ip": "I",
+    "ts": "q",
+    "method": "I",
+    "path": "I",
+    "status": "H",
+    "size": "q",
+}
+DICT_COLUMNS = ("ip", "method", "path")
+
+
+class ColumnWriter:
+    """Accumulate parsed rows into typed arrays, spilling each column to its own file."""
+
+    def __init__(self, out_path: str) -> None:
+        self.out_path = out_path
+        self.rows = 0
+        self.buffers = {name: array(code) for name, code in COLUMNS.items()}
+        self.codes: Dict[str, Dict[bytes, int]] = {name: {} for name in DICT_COLUMNS}
+        self.spill_paths = {name: f"{out_path}.{name}.tmp" for name in COLUMNS}
+        self.spills = {name: open(p, 'wb') for name, p in self.spill_paths.items()}
+
+    def _encode(self, column: str, value: bytes) -> int:
+        codes = self.codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, ip: bytes, ts: int, method: bytes, path: bytes, status: int, size: int) -> None:
+        b = self.buffers
+        b["ip"].append(self._encode("ip", ip))
+        b["ts"].append(ts)
+        b["method"].append(self._encode("method", method))
+        b["path"].append(self._encode("path", path))
+        b["status"].append(status)
+        b["size"].append(size)
+        self.rows += 1
+        if len(b["ts"]) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        for name, buf in self.buffers.items():
+            if sys.byteorder != "little":
+                buf.byteswap()
+            buf.tofile(self.spills[name])
+            self.buffers[name] = array(COLUMNS[name])
+
+    def close(self) -> None:
+        """Write the header, then append every spilled column at an aligned offset."""
+        self.flush()
+        for fh in self.spills.values():
+            fh.close()
+        meta: Dict[str, dict] = {}
+        offset = 0
+        for name, code in COLUMNS.items():
+            length = os.path.getsize(self.spill_paths[name])
+            meta[name] = {"type": code, "offset": offset, "length": length}
+            if name in self.codes:
+                # Codes were handed out in insertion order, so list order == code
+                meta[name]["dict"] = [v.decode('utf-8', errors='replace') for v in self.codes[name]]
+            offset += -(-length // ALIGN) * ALIGN
+        header = json.dumps({"rows": self.rows, "columns": meta}).encode('utf-8')
+        prefix = len(MAGIC) + 8 + len(header)
+        data_start = -(-prefix // ALIGN) * ALIGN
+        with open(self.out_path, 'wb') as out:
+            out.write(MAGIC)
+            out.write(struct.pack('<Q', len(header)))
+            out.write(header)
+            out.write(b"\0" * (data_start - prefix))
+            for name in COLUMNS:
+                with open(self.spill_paths[name], 'rb') as src:
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                length = meta[name]["length"]
+                out.write(b"\0" * (-(-length // ALIGN) * ALIGN - length))
+        for p in self.spill_paths.values():
+            os.remove(p)
+
+
+def build_cache(log_path: str, out_path: str) -> int:
+    """Parse log_path once into the columnar file out_path. Returns the row count."""
+    writer = ColumnWriter(out_path)
+    try:
+        for block in block_stream(log_path):
+            for row in parse_clf_block(block):
+                writer.add(*row)
+    except BaseException:
+        for fh in writer.spills.values():
+            fh.close()
+        for p in writer.spill_paths.values():
+            if os.path.exists(p):
+                os.remove(p)
+        raise
+    writer.close()
+    return writer.rows
+
+
+class ColumnStore:
+    """Read-only memory-mapped view of a file written by build_cache."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a column cache: {path}")
+        (header_len,) = struct.unpack_from('<Q', self._mm, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mm[header_start:header_start + header_len])
+        self.rows: int = header["rows"]
+        self.meta: Dict[str, dict] = header["columns"]
+        self._data_start = -(-(header_start + header_len) // ALIGN) * ALIGN
+
+    def column(self, name: str):
+        """
+        Zero-copy view of a column: a NumPy array if available, else a typed
+        memoryview. The view keeps the mapping alive, so it stays valid after
+        the store is closed.
+        """
+        info = self.meta[name]
+        start = self._data_start + info["offset"]
+        if np is not None:
+            dtype = np.dtype(info["type"]).newbyteorder('<')
+            return np.frombuffer(self._mm, dtype=dtype, count=info["length"] // dtype.itemsize, offset=start)
+        return memoryview(self._mm)[start:start + info["length"]].cast(info["type"])
+
+    def dictionary(self, name: str) -> List[str]:
+        return self.meta[name]["dict"]
+
+    def close(self) -> None:
+        self._file.close()
+        try:
+            self._mm.close()
+        except BufferError:
+            # Columns handed out are still alive; the mapping is unmapped
+            # when the last of them is freed
+            pass
+
+    def __enter__(self) -> "ColumnStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def top_paths_by_bytes(store: ColumnStore, k: int = 10) -> List[Tuple[str, int]]:
+    """Paths ranked by total response bytes."""
+    paths = store.column("path")
+    sizes = store.column("size")
+    names = store.dictionary("path")
+    if np is not None:
+        sums = np.bincount(paths, weights=sizes, minlength=len(names))
+        top = np.argsort(sums)[::-1][:k]
+        return [(names[i], int(sums[i])) for i in top]
+    totals = [0] * len(names)
+    for code, size in zip(paths, sizes):
+        totals[code] += size
+    top = heapq.nlargest(k, range(len(names)), key=totals.__getitem__)
+    return [(names[i], totals[i]) for i in top]
+
+
+def status_counts_per_ip(store: ColumnStore) -> Dict[str, Dict[int, int]]:
+    """{ip: {status: hits}} over every row."""
+    ips = store.column("ip")
+    statuses = store.column("status")
+    names = store.dictionary("ip")
+    result: Dict[str, Dict[int, int]] = {}
+    if np is not None:
+        # Pack (ip code, status) into one int64 key and count the keys
+        keys = ips.astype(np.int64) * 1000 + statuses
+        uniq, counts = np.unique(keys, return_counts=True)
+        pairs = zip((uniq // 1000).tolist(), (uniq % 1000).tolist(), counts.tolist())
+    else:
+        pairs = ((ip, status, n) for (ip, status), n in Counter(zip(ips, statuses)).items())
+    for ip, status, n in pairs:
+        result.setdefault(names[ip], {})[status] = n
+    return result
+
+
+def text_top_paths_by_bytes(log_path: str, k: int = 10) -> List[Tuple[str, int]]:
+    """Same query answered by reparsing the text log (the baseline)."""
+    totals: Dict[bytes, int] = {}
+    for block in block_stream(log_path):
+        for _, _, _, path, _, size in parse_clf_block(block):
+            totals[path] = totals.get(path, 0) + size
+    top = heapq.nlargest(k, totals.items(), key=lambda kv: kv[1])
+    return [(p.decode('utf-8', errors='replace'), n) for p, n in top]
+
+
+def benchmark(log_path: str, cache_path: Optional[str] = None, trials: int = 5,
+              warmup: int = 1, caches: List[str] = ["warm"]) -> List[dict]:
+    """
+    Text reparse against queries over the mapped cache, through io_bench.
+    Each query opens the store itself, so cold runs include faulting the
+    evicted columns back in.
+    """
+    cache_path = cache_path or log_path + ".col"
+    start = time.perf_counter()
+    rows = build_cache(log_path, cache_path)
+    print(f"build cache ({rows} rows): {time.perf_counter() - start:.3f}s")
+
+    def on_store(query):
+        def run() -> None:
+            with ColumnStore(cache_path) as store:
+                query(store)
+        return run
+
+    cases = [
+        ("top paths by bytes, reparse text", lambda: text_top_paths_by_bytes(log_path), log_path),
+        ("top paths by bytes, mapped columns", on_store(top_paths_by_bytes), cache_path),
+        ("status counts per ip, mapped columns", on_store(status_counts_per_ip), cache_path),
+    ]
+    results = []
+    for label, fn, path in cases:
+        for cache in caches:
+            result = io_bench.measure(fn, trials, warmup, cache, [path])
+            result["query"] = label
+            results.append(result)
+            print(io_bench.format_result(f"{label} [{cache}]", result))
+    print(f"engine: {'numpy' if np is not None else 'pure Python memoryview'}")
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="log_columns.py",
+                                     description="Columnar cache for CLF access logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="parse a log into a column cache")
+    p_build.add_argument("log_path")
+    p_build.add_argument("cache_path")
+    p_query = sub.add_parser("query", help="run a group-by query over a cache")
+    p_query.add_argument("cache_path")
+    p_query.add_argument("query", choices=("top-paths", "status-per-ip"))
+    p_query.add_argument("-k", type=int, default=10)
+    p_bench = sub.add_parser("bench", help="compare reparsing text with the cache")
+    p_bench.add_argument("log_path")
+    p_bench.add_argument("cache_path", nargs="?")
+    io_bench.add_arguments(p_bench)
+    args = parser.parse_args(argv[1:])
+
+    if args.command == "build":
+        if not os.path.isfile(args.log_path):
+            print(f"Error: File not found: {args.log_path}")
+            return 2
+        rows = build_cache(args.log_path, args.cache_path)
+        print(f"Wrote {rows} rows to {args.cache_path}")
+        return 0
+
+    if args.command == "bench":
+        results = benchmark(args.log_path, args.cache_path, args.trials, args.warmup,
+                            io_bench.cache_modes(args.cache))
+        if args.json:
+            io_bench.write_report(args.json, "log_columns", results, log_path=os.path.abspath(args.log_path),
+                                  numpy=np is not None)
+        return 0
+
+    with ColumnStore(args.cache_path) as store:
+        if args.query == "top-paths":
+            print(f"Top {args.k} paths by bytes:")
+            for rank, (path, total) in enumerate(top_paths_by_bytes(store, args.k), start=1):
+                print(f"{rank:2d}. {path} -> {total}")
+        else:
+            for ip, statuses in status_counts_per_ip(store).items():
+                summary = ", ".join(f"{s}: {n}" for s, n in sorted(statuses.items()))
+                print(f"{ip} -> {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+import os
+import sys
+import gzip
+import time
+import random
+import argparse
+from itertools import accumulate
+from typing import BinaryIO, List
+
+"""
+Synthetic Common Log Format generator for benchmarking the log tools.
+Constraints:
+- Deterministic: the same seed and options always produce the same bytes
+- Client IPs and paths follow a Zipf distribution (a few very hot keys,
+  a long tail) with configurable cardinality and exponent
+- Target sizes from megabytes to tens of gigabytes; lines are generated
+  in batches so memory stays constant whatever the output size
+- Optional gzip output (the size target counts uncompressed bytes)
+"""
+
+METHODS = ["GET", "POST", "PUT", "DELETE", "HEAD"]
+METHOD_WEIGHTS = list(accumulate([80, 12, 4, 2, 2]))
+STATUSES = [200, 304, 302, 404, 500, 403]
+STATUS_WEIGHTS = list(accumulate([75, 8, 6, 8, 2, 1]))
+BATCH_LINES = 10000
+START_EPOCH = 1769248800  # 24/Jan/2026:10:00:00 +0000, as in small_access.log
+
+
+def parse_size(text: str) -> int:
+    """'500M', '1G', '50G' or a plain byte count -> bytes."""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def zipf_cum_weights(n: int, s: float) -> List[float]:
+    """Cumulative weights of ranks 1..n with P(rank) proportional to 1 / rank**s."""
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def make_ips(rng: random.Random, n: int) -> List[str]:
+    """n distinct IPv4 addresses; rank order is random so hot IPs are not adjacent."""
+    seen = set()
+    ips = []
+    while len(ips) < n:
+        value = rng.getrandbits(32)
+        if value in seen or value >> 24 in (0, 127, 255):
+            continue
+        seen.add(value)
+        ips.append(f"{value >> 24}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}")
+    return ips
+
+
+def make_paths(rng: random.Random, n: int) -> List[str]:
+    kinds = ["page", "api/v1/items", "static/js", "static/img", "user"]
+    return [f"/{rng.choice(kinds)}/{i}" for i in range(n)]
+
+
+def generate(out: BinaryIO, size_bytes: int, ips: int = 100000, paths: int = 5000,
+             zipf_s: float = 1.1, lines_per_sec: int = 2000, seed: int = 42) -> int:
+    """Write CLF lines to `out` until at least size_bytes were written. Returns line count."""
+    rng = random.Random(seed)
+    ip_pool = make_ips(rng, ips)
+    path_pool = make_paths(rng, paths)
+    ip_cum = zipf_cum_weights(ips, zipf_s)
+    path_cum = zipf_cum_weights(paths, zipf_s)
+    written = 0
+    lines = 0
+    stamp_second = -1
+    stamp = ""
+    while written < size_bytes:
+        batch_ips = rng.choices(ip_pool, cum_weights=ip_cum, k=BATCH_LINES)
+        batch_paths = rng.choices(path_pool, cum_weights=path_cum, k=BATCH_LINES)
+        methods = rng.choices(METHODS, cum_weights=METHOD_WEIGHTS, k=BATCH_LINES)
+        statuses = rng.choices(STATUSES, cum_weights=STATUS_WEIGHTS, k=BATCH_LINES)
+        out_lines = []
+        for ip, path, method, status in zip(batch_ips, batch_paths, methods, statuses):
+            second = START_EPOCH + lines // lines_per_sec
+            if second != stamp_second:
+                stamp_second = second
+                stamp = time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime(second))
+            size = "-" if status == 304 else str(rng.randrange(128, 65536))
+            out_lines.append(f'{ip} - - [{stamp}] "{method} {path} HTTP/1.1" {status} {size}\n')
+            lines += 1
+        chunk = "".join(out_lines).encode("ascii")
+        out.write(chunk)
+        written += len(chunk)
+    return lines
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="log_generator.py",
+                                     description="Deterministic synthetic CLF access logs")
+    parser.add_argument("out_path")
+    parser.add_argument("--size", default="1G", help="uncompressed target size, e.g. 200M, 1G, 50G")
+    parser.add_argument("--ips", type=int, default=100000, help="distinct client IPs")
+    parser.add_argument("--paths", type=int, default=5000, help="distinct request paths")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent for IPs and paths")
+    parser.add_argument("--rate", type=int, default=2000, help="lines per second of log time")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    args = parser.parse_args(argv[1:])
+
+    size = parse_size(args.size)
+    start = time.perf_counter()
+    if args.gzip:
+        # No file name and mtime=0 keep the gzip header, and so the output, deterministic
+        with open(args.out_path, "wb") as raw, \
+                gzip.GzipFile(filename="", fileobj=raw, mode="wb", compresslevel=6, mtime=0) as out:
+            lines = generate(out, size, args.ips, args.paths, args.zipf, args.rate, args.seed)
+    else:
+        with open(args.out_path, "wb") as out:
+            lines = generate(out, size, args.ips, args.paths, args.zipf, args.rate, args.seed)
+    elapsed = time.perf_counter() - start
+    on_disk = os.path.getsize(args.out_path)
+    print(f"Wrote {lines} lines ({on_disk} bytes on disk) to {args.out_path} "
+          f"in {elapsed:.1f}s ({size / (1 << 20) / elapsed:.1f} MB/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,12 @@
+import os
 import sys
-from typing import List
+import mmap
+import time
+import random
+import hashlib
+import argparse
+import subprocess
+from typing import List, Optional
 
 """
 Day 2: Reverse Words In-Place (LC 151)
@@ -8,8 +15,18 @@ Constraints:
 - Convert string to char buffer (list) and operate in-place
 - Algorithm: reverse entire buffer, then reverse each word, then compact spaces
 - O(1) extra space beyond the buffer itself
+- Large text: the same three passes over a bytearray or a writable mmap,
+  in place. Ranges are reversed in bounded blocks with C-level slice
+  copies, and words are found with find(), so there are no per-character
+  Python objects
+- Streaming: for files larger than RAM, blocks are read from the end of
+  the file and their words written out in reverse order; memory is one
+  block plus the longest word
 """
 
+BLOCK = 1 << 16
+SPACE = 32
+
 
 def reverse_range(buf: List[str], i: int, j: int) -> None:
     while i < j:
@@ -67,10 +84,218 @@ def reverse_words_inplace(s: str) -> str:
     return ''.join(compacted)
 
 
+def reverse_span(buf, i: int, j: int) -> None:
+    """Reverse buf[i:j] in place, swapping BLOCK-sized slices from both ends."""
+    while j - i >= 2 * BLOCK:
+        left = buf[i:i + BLOCK]
+        right = buf[j - BLOCK:j]
+        buf[i:i + BLOCK] = right[::-1]
+        buf[j - BLOCK:j] = left[::-1]
+        i += BLOCK
+        j -= BLOCK
+    if j - i > 1:
+        buf[i:j] = buf[i:j][::-1]
+
+
+def reverse_words_buffer(buf, n: Optional[int] = None) -> int:
+    """
+    Three passes over a bytearray or writable mmap, in place. Returns the
+    compacted length: the result is buf[:length], the rest is garbage.
+    """
+    n = len(buf) if n is None else n
+    # Pass 1: reverse entire buffer
+    reverse_span(buf, 0, n)
+
+    # Pass 2: reverse each word back
+    i = 0
+    while i < n:
+        if buf[i] == SPACE:
+            i += 1
+            continue
+        j = buf.find(b" ", i, n)
+        if j == -1:
+            j = n
+        if j - i >= 2 * BLOCK:
+            reverse_span(buf, i, j)
+        elif j - i > 1:
+            buf[i:j] = buf[i:j][::-1]  # the common short word, without a call
+        i = j
+
+    # Pass 3: compact spaces, moving each word left to the write position
+    write = 0
+    i = 0
+    while i < n:
+        if buf[i] == SPACE:
+            i += 1
+            continue
+        j = buf.find(b" ", i, n)
+        if j == -1:
+            j = n
+        if write:
+            buf[write] = SPACE
+            write += 1
+        if write != i:
+            buf[write:write + j - i] = buf[i:j]
+        write += j - i
+        i = j
+    return write
+
+
+def reverse_words_file(path: str) -> int:
+    """Reverse a file's words in place through mmap; returns the new size."""
+    size = os.path.getsize(path)
+    if not size:
+        return 0
+    with open(path, "r+b") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE) as mm:
+            length = reverse_words_buffer(mm)
+            mm.flush()
+        f.truncate(length)
+    return length
+
+
+def reverse_words_stream(src: str, dst: str, block_size: int = 1 << 20) -> int:
+    """
+    Word order of src reversed into dst, reading src backwards one block at
+    a time. The fragment at the front of a block may be the tail of a word
+    that starts in the previous block, so it is carried over and prepended
+    to that block. Returns the bytes written.
+    """
+    written = 0
+    fd = os.open(src, os.O_RDONLY)
+    try:
+        with open(dst, "wb") as out:
+            pos = os.fstat(fd).st_size
+            carry = b""
+            while pos > 0:
+                start = max(0, pos - block_size)
+                chunk = bytearray(os.pread(fd, pos - start, start)) + carry
+                pos = start
+                if pos:
+                    cut = chunk.find(b" ")
+                    if cut == -1:
+                        carry = bytes(chunk)  # still inside one long word
+                        continue
+                    carry = bytes(chunk[:cut])
+                    del chunk[:cut]
+                else:
+                    carry = b""
+                length = reverse_words_buffer(chunk)
+                if length:
+                    if written:
+                        out.write(b" ")
+                        written += 1
+                    out.write(memoryview(chunk)[:length])
+                    written += length
+    finally:
+        os.close(fd)
+    return written
+
+
+def make_text_file(path: str, size_bytes: int, seed: int = 7) -> None:
+    """Random words separated by runs of 1-3 spaces, for benchmarking."""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 12)))
+             for _ in range(5000)]
+    with open(path, "w", encoding="ascii") as f:
+        written = 0
+        while written < size_bytes:
+            piece = "".join(word + " " * rng.randint(1, 3) for word in rng.choices(vocab, k=10000))
+            f.write(piece)
+            written += len(piece)
+
+
+def run_mode(mode: str, src: str, dst: str) -> float:
+    """Reverse src into dst with one implementation; returns seconds taken."""
+    start = time.perf_counter()
+    if mode == "list":
+        with open(src, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(reverse_words_inplace(text))
+    elif mode == "bytearray":
+        with open(src, "rb") as f:
+            buf = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(buf)
+        length = reverse_words_buffer(buf)
+        with open(dst, "wb") as f:
+            f.write(memoryview(buf)[:length])
+    elif mode == "mmap":
+        reverse_words_file(dst)  # in place: the caller copied src to dst
+    else:
+        reverse_words_stream(src, dst)
+    return time.perf_counter() - start
+
+
+MODES = ("list", "bytearray", "mmap", "stream")
+
+
+def benchmark(path: str) -> None:
+    """
+    Each mode in a fresh child so os.wait4 gives that mode's own peak RSS.
+    All modes must produce the same bytes. Outputs are compared by digest:
+    the child's peak RSS starts from the parent's, so the parent stays small.
+    """
+    size_mb = os.path.getsize(path) / (1 << 20)
+    reference = None
+    print(f"{'mode':<10} {'seconds':>8} {'MB/s':>8} {'peak RSS MB':>12}")
+    for mode in MODES:
+        dst = f"{path}.{mode}"
+        if mode == "mmap":
+            with open(path, "rb") as f, open(dst, "wb") as out:
+                for chunk in iter(lambda: f.read(BLOCK * 16), b""):
+                    out.write(chunk)
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run", mode, path, dst],
+                                stdout=subprocess.PIPE)
+        output = proc.stdout.read()
+        proc.stdout.close()
+        _, status, usage = os.wait4(proc.pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            print(f"{mode:<10} failed")
+            continue
+        elapsed = float(output)
+        digest = hashlib.sha256()
+        with open(dst, "rb") as f:
+            for chunk in iter(lambda: f.read(BLOCK * 16), b""):
+                digest.update(chunk)
+        result = digest.digest()
+        os.remove(dst)
+        if reference is None:
+            reference = result
+        note = "" if result == reference else "  MISMATCH"
+        # ru_maxrss is in kilobytes on Linux
+        print(f"{mode:<10} {elapsed:8.3f} {size_mb / elapsed:8.1f} {usage.ru_maxrss / 1024:12.1f}{note}")
+
+
 def main(argv: List[str]) -> int:
     if len(argv) < 2:
         print("Usage: python3 Day2_reverse_words_inplace.py \"  hello   world  \"")
+        print("       python3 Day2_reverse_words_inplace.py --file PATH          (in place, mmap)")
+        print("       python3 Day2_reverse_words_inplace.py --stream SRC DST")
+        print("       python3 Day2_reverse_words_inplace.py --benchmark PATH [SIZE_MB]")
         return 2
+    if argv[1] in ("--file", "--stream", "--benchmark", "--run"):
+        parser = argparse.ArgumentParser(prog="reverse_words_inplace.py")
+        parser.add_argument("--file", metavar="PATH")
+        parser.add_argument("--stream", nargs=2, metavar=("SRC", "DST"))
+        parser.add_argument("--benchmark", nargs="+", metavar="PATH [SIZE_MB]")
+        parser.add_argument("--run", nargs=3, metavar=("MODE", "SRC", "DST"), help=argparse.SUPPRESS)
+        args = parser.parse_args(argv[1:])
+        if args.run:
+            mode, src, dst = args.run
+            print(run_mode(mode, src, dst))
+        elif args.file:
+            print(f"{args.file}: {reverse_words_file(args.file)} bytes")
+        elif args.stream:
+            print(f"{args.stream[1]}: {reverse_words_stream(*args.stream)} bytes")
+        else:
+            path = args.benchmark[0]
+            if not os.path.isfile(path):
+                size_mb = float(args.benchmark[1]) if len(args.benchmark) > 1 else 50
+                print(f"Creating {size_mb:g}MB text file...")
+                make_text_file(path, int(size_mb * (1 << 20)))
+            benchmark(path)
+        return 0
     s = argv[1]
     print(reverse_words_inplace(s))
     return 0
@@ -0,0 +1,183 @@
+import os
+import sys
+import math
+import mmap
+import argparse
+import multiprocessing
+from typing import Dict, Iterator, List, Tuple
+
+from top_ips_heap import BLOCK_SIZE, block_stream, compression_opener, parse_clf_block, split_ranges
+
+"""
+Streaming p50/p95/p99 of the response-size (bytes) field of CLF logs.
+Constraints:
+- One pass, no sorting, raw values are never stored
+- HDR-style log-bucketed histogram: values keep SUB_BITS significant bits,
+  so every reported percentile is within 1 / 2^(SUB_BITS-1) of a real value
+- At most NUM_BUCKETS buckets per key, whatever the number of values
+- Histograms merge by adding bucket counts, so byte-range workers can each
+  build their own and the parent combines them
+"""
+
+SUB_BITS = 6  # relative error <= 1/32 (~3%)
+HALF = 1 << (SUB_BITS - 1)
+NUM_BUCKETS = (1 << SUB_BITS) + (64 - SUB_BITS) * HALF
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def bucket_of(value: int) -> int:
+    """Exact below 2^SUB_BITS; above, the top SUB_BITS bits of the value."""
+    if value < (1 << SUB_BITS):
+        return value
+    shift = value.bit_length() - SUB_BITS
+    # value >> shift has exactly SUB_BITS bits: it lies in [HALF, 2*HALF)
+    return (1 << SUB_BITS) + (shift - 1) * HALF + ((value >> shift) - HALF)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Inclusive [low, high] range of values that land in bucket `index`."""
+    if index < (1 << SUB_BITS):
+        return index, index
+    shift, offset = divmod(index - (1 << SUB_BITS), HALF)
+    shift += 1
+    low = (HALF + offset) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LogHistogram:
+    """Sparse bucket counts plus exact count/min/max/sum."""
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+        idx = bucket_of(value)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+
+    def merge(self, other: "LogHistogram") -> None:
+        if other.count == 0:
+            return
+        if self.count == 0 or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+        for idx, n in other.buckets.items():
+            self.buckets[idx] = self.buckets.get(idx, 0) + n
+
+    def quantile(self, q: float) -> int:
+        """Midpoint of the bucket holding the q-th value, clamped to [min, max]."""
+        if self.count == 0:
+            return 0
+        # Nearest rank: the smallest value with at least q of the values at or
+        # below it; round() drops float noise such as 0.07 * 100 = 7.000000000000001
+        rank = max(1, math.ceil(round(q * self.count, 9)))
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                low, high = bucket_bounds(idx)
+                return min(max((low + high) // 2, self.min), self.max)
+        return self.max
+
+
+Histograms = Dict[str, Dict[bytes, LogHistogram]]
+
+
+def new_groups() -> Histograms:
+    return {"path": {}, "status": {}, "all": {}}
+
+
+def add_rows(groups: Histograms, buf) -> None:
+    by_path, by_status, overall = groups["path"], groups["status"], groups["all"]
+    everything = overall.setdefault(b"*", LogHistogram())
+    for _, _, _, path, status, size in parse_clf_block(buf):
+        hist = by_path.get(path)
+        if hist is None:
+            hist = by_path[path] = LogHistogram()
+        hist.add(size)
+        key = b"%d" % status
+        hist = by_status.get(key)
+        if hist is None:
+            hist = by_status[key] = LogHistogram()
+        hist.add(size)
+        everything.add(size)
+
+
+def histogram_range(task: Tuple[str, int, int]) -> Histograms:
+    """Worker: histograms for the lines in [start, end) of the mmapped file."""
+    path, start, end = task
+    groups = new_groups()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            nl = mm.find(b"\n", min(pos + BLOCK_SIZE, end) - 1, end)
+            stop = nl + 1 if nl != -1 else end
+            add_rows(groups, mm[pos:stop])
+            pos = stop
+    return groups
+
+
+def merge_groups(into: Histograms, other: Histograms) -> None:
+    for dim, hists in other.items():
+        target = into[dim]
+        for key, hist in hists.items():
+            if key in target:
+                target[key].merge(hist)
+            else:
+                target[key] = hist
+
+
+def size_histograms(log_path: str, workers: int = 1) -> Histograms:
+    groups = new_groups()
+    if workers <= 1 or compression_opener(log_path):
+        for block in block_stream(log_path):
+            add_rows(groups, block)
+        return groups
+    tasks = [(log_path, start, end) for start, end in split_ranges(log_path, workers * 4)]
+    with multiprocessing.Pool(processes=workers) as pool:
+        for partial in pool.imap_unordered(histogram_range, tasks):
+            merge_groups(groups, partial)
+    return groups
+
+
+def report(hists: Dict[bytes, LogHistogram], top: int) -> Iterator[str]:
+    """Rows for the `top` keys with the most requests."""
+    ranked = sorted(hists.items(), key=lambda kv: kv[1].count, reverse=True)[:top]
+    for key, hist in ranked:
+        cells = " ".join(f"{hist.quantile(q):>10}" for q in QUANTILES)
+        yield f"{key.decode('utf-8', errors='replace'):<32} {hist.count:>10} {cells} {hist.max:>10}"
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="size_percentiles.py",
+                                     description="Streaming response-size percentiles of a CLF log")
+    parser.add_argument("log_path")
+    parser.add_argument("--by", choices=("path", "status", "all"), default="status")
+    parser.add_argument("--top", type=int, default=20, help="keys to show, busiest first")
+    parser.add_argument("--workers", type=int, default=1, help="byte-range worker processes")
+    args = parser.parse_args(argv[1:])
+    if not os.path.isfile(args.log_path):
+        print(f"Error: File not found: {args.log_path}")
+        return 2
+
+    groups = size_histograms(args.log_path, args.workers)
+    header = " ".join(f"{'p' + format(q * 100, 'g'):>10}" for q in QUANTILES)
+    print(f"{args.by:<32} {'requests':>10} {header} {'max':>10}")
+    for row in report(groups[args.by], args.top):
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
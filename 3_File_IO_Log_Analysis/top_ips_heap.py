@@ -1,9 +1,30 @@
+import io
 import os
 import sys
+import bz2
+import gzip
+import lzma
+import zlib
+import math
+import mmap
+import re
+import time
 import heapq
+import hashlib
+import json
+import socket
+import struct
+import queue
+import argparse
+import calendar
+import subprocess
 import tempfile
+import threading
+import multiprocessing
 import shutil
-from typing import Iterator, List, Tuple
+from array import array
+from collections import Counter
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 
 """
 Parse a large Apache log file to find the top 10 IP addresses.
@@ -12,16 +33,169 @@ Constraints:
 - Use a dict to count frequencies
 - Use heapq.nlargest to find the top 10
 - Keep memory bounded by bucketizing IPs to temporary files
+- Alternative "sketch" mode: one streaming pass in fixed memory using
+  Misra-Gries counters, verified by a Count-Min sketch
+- Alternative "parallel" mode: newline-aligned byte ranges parsed through
+  mmap by a multiprocessing pool, partial counters merged at the end
+- Alternative "bytes" mode: read raw 1MB blocks and pull IP tokens out with
+  one regex scan per block; only the final top 10 keys are decoded
+- --checkpoint: persist offset + file identity + counters so reruns on an
+  append-only log parse only the newly appended bytes
+- --follow: tail the log like `tail -F` and keep the top IPs of a sliding
+  time window keyed on the CLF timestamp
+- gzip/bz2/xz logs are read transparently; in the block path a producer
+  thread decompresses (the codecs release the GIL) into a bounded queue so
+  decompression overlaps parsing
+- Alternative "hybrid" mode: exact counts in memory up to a byte budget;
+  only on overflow are sorted runs spilled to disk and k-way merged
+- Alternative "ipv4" mode: dotted quads packed into 32-bit ints and
+  aggregated with NumPy (np.unique + argpartition); IPv6 and malformed
+  tokens fall back to a dict
 """
 
+MODES = ("bucket", "sketch", "parallel", "bytes", "hybrid", "ipv4")
+
+# First token of every line (text before the first space), matched on raw
+# bytes. Anchoring on a literal newline lets the regex engine jump between
+# newlines instead of trying every offset, so one findall per block replaces
+# the per-line decode + split + strip of extract_ip. The first line of a
+# block has no preceding newline and is matched by FIRST_TOKEN.
+IP_TOKEN = re.compile(rb'\n([^ \r\n]+)')
+FIRST_TOKEN = re.compile(rb'[^ \r\n]+')
+BLOCK_SIZE = 1024 * 1024
+PREFETCH_DEPTH = 8
+DEFAULT_MEMORY_MB = 64
+POLL_INTERVAL = 0.05  # benchmark temp-disk sampling
+IPV4_BATCH = 1 << 22
+IPV4_WIDTH = 16  # longest dotted quad (15) plus its terminator
+COMPRESSED_FORMATS = (
+    (b"\x1f\x8b", gzip.open),
+    (b"BZh", bz2.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+)
+CHECKPOINT_VERSION = 1
+HEAD_BYTES = 4096
+MONTHS = {name.encode(): i for i, name in enumerate(calendar.month_abbr) if name}
+
+# Full Common Log Format line:
+#   ip ident user [timestamp] "METHOD path protocol" status bytes
+# Groups: ip, timestamp body, method, path, status, bytes ('-' when empty).
+CLF_LINE = re.compile(
+    rb'^(\S+) \S+ \S+ \[([^\]]*)\] "(\S+) (\S+)[^"]*" (\d{3}) (\d+|-)', re.M)
+
+
+def compression_opener(path: str) -> Optional[Callable[..., BinaryIO]]:
+    """Sniff the magic bytes of a regular file; None means plain text."""
+    if not os.path.isfile(path):
+        return None  # pipes and devices cannot be rewound after sniffing
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, opener in COMPRESSED_FORMATS:
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def open_log(path: str) -> BinaryIO:
+    """Open a log for binary reading, decompressing gzip/bz2/xz transparently."""
+    opener = compression_opener(path)
+    return opener(path, 'rb') if opener else open(path, 'rb')
+
 
 def line_stream(path: str) -> Iterator[str]:
     """Yield lines from the file one by one without loading entire file."""
-    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+    with io.TextIOWrapper(open_log(path), encoding='utf-8', errors='ignore') as f:
         for line in f:
             yield line
 
 
+def read_chunks(path: str, chunk_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    with open_log(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def prefetched_chunks(path: str, chunk_size: int = BLOCK_SIZE,
+                      depth: int = PREFETCH_DEPTH) -> Iterator[bytes]:
+    """
+    Same chunks as read_chunks, produced by a background thread. zlib, bz2
+    and lzma drop the GIL while decompressing, so the next chunks inflate
+    while the caller parses this one. The queue holds at most `depth`
+    chunks, bounding memory when parsing is the slower side.
+    """
+    chunks: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer() -> None:
+        try:
+            for chunk in read_chunks(path, chunk_size):
+                if not put(chunk):
+                    return
+            put(b"")
+        except BaseException as exc:
+            put(exc)
+
+    thread = threading.Thread(target=producer, name="decompress", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                return
+            yield item
+    finally:
+        # Also reached when the consumer stops early: unblock the producer
+        stop.set()
+        thread.join()
+
+
+def block_stream(path: str, block_size: int = BLOCK_SIZE,
+                 prefetch: bool = True) -> Iterator[bytes]:
+    """
+    Yield raw byte blocks that always end on a line boundary; the partial
+    line at the end of each read is carried into the next block.
+    Compressed input is decompressed in a producer thread unless prefetch=False.
+    """
+    if prefetch and compression_opener(path):
+        chunks = prefetched_chunks(path, block_size)
+    else:
+        chunks = read_chunks(path, block_size)
+    carry = b""
+    for block in chunks:
+        cut = block.rfind(b"\n")
+        if cut == -1:
+            carry += block
+            continue
+        yield carry + block[:cut + 1]
+        carry = block[cut + 1:]
+    if carry:
+        yield carry
+
+
+def count_block(buf, counts: Counter, pos: int = 0, endpos: int = -1) -> None:
+    """Count IP tokens of the lines in buf[pos:endpos]; pos must start a line."""
+    if endpos < 0:
+        endpos = len(buf)
+    first = FIRST_TOKEN.match(buf, pos, endpos)
+    if first:
+        counts[first.group()] += 1
+    counts.update(IP_TOKEN.findall(buf, pos, endpos))
+
+
 def extract_ip(line: str) -> str:
     """Extract the leading IP (first token) from an Apache log line."""
     # Common Log Format starts with the client IP
@@ -37,7 +211,9 @@ def bucket_index(ip: str, buckets: int = 1024) -> int:
     """Map an IP to a bucket index. Works for IPv4/IPv6 and malformed tokens."""
     if not ip:
         return 0
-    return hash(ip) % buckets
+    # crc32 rather than hash(): str hashing is salted per process, which
+    # would give every run a different bucket layout
+    return zlib.crc32(ip.encode('utf-8')) % buckets
 
 
 def bucketize_ips(log_path: str, buckets: int = 1024) -> List[str]:
@@ -69,14 +245,728 @@ def top10_from_bucket(bucket_path: str) -> List[Tuple[str, int]]:
     return heapq.nlargest(10, counts.items(), key=lambda kv: kv[1])
 
 
-def compute_top10(log_path: str, buckets: int = 1024) -> List[Tuple[str, int]]:
+class MisraGries:
+    """
+    Frequent-items summary holding at most `capacity` counters.
+    When a new key arrives and the table is full, every counter and the new
+    key's weight are decremented by the same amount (`rounds` sums these)
+    and zeroed keys are dropped. A stored count undercounts the true
+    frequency by at most `rounds`, and rounds <= n / (capacity + 1).
+    Amortized O(1) per unit of weight: a decrement by d removes
+    d * (capacity + 1) units of mass.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = capacity
+        self.counters: Dict[bytes, int] = {}
+        self.rounds = 0
+        self.total = 0
+
+    def add(self, key: bytes, count: int = 1) -> None:
+        self.total += count
+        counters = self.counters
+        if key in counters:
+            counters[key] += count
+            return
+        while count and len(counters) >= self.capacity:
+            d = min(count, min(counters.values()))
+            self.rounds += d
+            count -= d
+            counters = self.counters = {k: c - d for k, c in counters.items() if c > d}
+        if count:
+            counters[key] = count
+
+
+class CountMinSketch:
+    """
+    depth x width matrix of counters; an item increments one cell per row.
+    estimate() never undercounts, and with probability 1 - e^-depth it
+    overcounts by at most e/width * n (see error_bound()).
+    Hashing uses blake2b so cell layout is stable across runs and processes.
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self.rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def _cells(self, key: bytes) -> List[int]:
+        # Double hashing: row i uses h1 + i*h2, from one 64-bit digest
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], 'little')
+        h2 = int.from_bytes(digest[4:], 'little') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: bytes, count: int = 1) -> None:
+        self.total += count
+        for row, cell in zip(self.rows, self._cells(key)):
+            row[cell] += count
+
+    def estimate(self, key: bytes) -> int:
+        return min(row[cell] for row, cell in zip(self.rows, self._cells(key)))
+
+    def error_bound(self) -> int:
+        return math.ceil(math.e / self.width * self.total)
+
+
+def sketch_top_k(log_path: str, k: int = 10, capacity: int = 1024,
+                 width: int = 1 << 16, depth: int = 4) -> List[Tuple[str, int, int]]:
+    """
+    Single streaming pass with fixed memory. Returns (ip, lower, upper) where
+    the true count is guaranteed to lie in [lower, upper]:
+    - lower: the Misra-Gries counter (never overcounts)
+    - upper: min(Count-Min estimate, lower + Misra-Gries rounds)
+    Results are ranked by upper. Any IP with true frequency above
+    n / (capacity + 1) is guaranteed to be among the candidates.
+    Each block is counted exactly first (count_block), so the sketches are
+    updated once per distinct IP per block, with its count as the weight.
+    """
+    mg = MisraGries(capacity)
+    cms = CountMinSketch(width, depth)
+    for block in block_stream(log_path):
+        block_counts: Counter = Counter()
+        count_block(block, block_counts)
+        for ip, n in block_counts.items():
+            mg.add(ip, n)
+            cms.add(ip, n)
+    results = []
+    for ip, lower in mg.counters.items():
+        upper = min(cms.estimate(ip), lower + mg.rounds)
+        results.append((ip.decode('utf-8', errors='ignore'), lower, upper))
+    return heapq.nlargest(k, results, key=lambda r: (r[2], r[1]))
+
+
+class SpillingCounter:
+    """
+    Exact counter that lives in a dict until its estimated footprint passes
+    `budget_bytes`. Only then is the dict sorted and written out as a run
+    file and cleared. items() k-way merges the runs with heapq.merge, so a
+    log whose distinct keys fit the budget never touches disk, and a huge
+    one stays bounded by the budget plus one buffered line per run.
+    """
+
+    # dict slot + bytes object header + int object, per distinct key
+    ENTRY_OVERHEAD = 112
+
+    def __init__(self, budget_bytes: int = DEFAULT_MEMORY_MB * 1024 * 1024) -> None:
+        self.budget_bytes = budget_bytes
+        self.counts: Dict[bytes, int] = {}
+        self.used = 0
+        self.temp_dir: Optional[str] = None
+        self.runs: List[str] = []
+
+    def update(self, block_counts: Dict[bytes, int]) -> None:
+        counts = self.counts
+        for key, n in block_counts.items():
+            old = counts.get(key)
+            if old is None:
+                counts[key] = n
+                self.used += self.ENTRY_OVERHEAD + len(key)
+            else:
+                counts[key] = old + n
+        if self.used > self.budget_bytes:
+            self.spill()
+
+    def spill(self) -> None:
+        """Write the in-memory counts as one sorted run and start over."""
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix="log_runs_")
+        path = os.path.join(self.temp_dir, f"run_{len(self.runs)}.txt")
+        # Keys never contain spaces or newlines (see FIRST_TOKEN)
+        with open(path, 'wb') as f:
+            for key, n in sorted(self.counts.items()):
+                f.write(b"%s %d\n" % (key, n))
+        self.runs.append(path)
+        self.counts = {}
+        self.used = 0
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple[bytes, int]]:
+        with open(path, 'rb') as f:
+            for line in f:
+                key, n = line.split(b" ")
+                yield key, int(n)
+
+    def items(self) -> Iterator[Tuple[bytes, int]]:
+        """Every (key, total) once; in key order when runs were spilled."""
+        if not self.runs:
+            yield from self.counts.items()
+            return
+        sources = [self._read_run(p) for p in self.runs]
+        sources.append(iter(sorted(self.counts.items())))
+        current, total = None, 0
+        for key, n in heapq.merge(*sources):
+            if key == current:
+                total += n
+                continue
+            if current is not None:
+                yield current, total
+            current, total = key, n
+        if current is not None:
+            yield current, total
+
+    def close(self) -> None:
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+        self.runs = []
+
+
+def hybrid_top_k(log_path: str, k: int = 10,
+                 memory_mb: int = DEFAULT_MEMORY_MB) -> Tuple[List[Tuple[str, int]], int]:
+    """Exact top k within a memory budget. Returns (top k, number of runs spilled)."""
+    counter = SpillingCounter(memory_mb * 1024 * 1024)
+    try:
+        for block in block_stream(log_path):
+            block_counts: Counter = Counter()
+            count_block(block, block_counts)
+            counter.update(block_counts)
+        top = heapq.nlargest(k, counter.items(), key=lambda kv: kv[1])
+        return [(ip.decode('utf-8', errors='ignore'), n) for ip, n in top], len(counter.runs)
+    finally:
+        counter.close()
+
+
+def load_numpy():
+    """
+    NumPy is optional and imported only by the modes that use it, so it does
+    not inflate the peak RSS that benchmark_modes reports for the others.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def pack_ipv4(token: bytes) -> int:
+    """
+    Strict dotted quad -> 32-bit int, or -1 for IPv6 / malformed tokens.
+    Octets with leading zeros are rejected: "01.2.3.4" is a different key
+    from "1.2.3.4" in every other mode, so it must not be merged into it.
+    """
+    parts = token.split(b".")
+    if len(parts) != 4:
+        return -1
+    value = 0
+    for part in parts:
+        if not part.isdigit() or len(part) > 3 or (len(part) > 1 and part[0] == 48):
+            return -1
+        octet = int(part)
+        if octet > 255:
+            return -1
+        value = value << 8 | octet
+    return value
+
+
+def vector_pack_block(np, block: bytes):
+    """
+    Parse the leading dotted quad of every line in one vectorized sweep.
+    Each line's first IPV4_WIDTH bytes become a row of a matrix, and a small
+    state machine runs column by column over all rows at once.
+    Returns (uint32 IPs, start offsets of lines that must take the dict path).
+    """
+    raw = np.frombuffer(block, dtype=np.uint8)
+    starts = np.flatnonzero(raw == 10) + 1
+    starts = np.concatenate(([0], starts[starts < len(raw)]))
+    padded = np.concatenate((raw, np.zeros(IPV4_WIDTH, dtype=np.uint8)))
+    window = padded[starts[:, None] + np.arange(IPV4_WIDTH)]
+    n = len(starts)
+    value = np.zeros(n, dtype=np.uint32)
+    octet = np.zeros(n, dtype=np.uint32)
+    digits = np.zeros(n, dtype=np.uint8)
+    dots = np.zeros(n, dtype=np.uint8)
+    done = np.zeros(n, dtype=bool)
+    ok = np.ones(n, dtype=bool)
+    for j in range(IPV4_WIDTH):
+        c = window[:, j]
+        active = ~done
+        is_digit = active & (c >= 48) & (c <= 57)
+        is_dot = active & (c == 46)
+        # A digit after a lone leading "0": not canonical, like pack_ipv4
+        ok &= ~(is_digit & (digits == 1) & (octet == 0))
+        octet = np.where(is_digit, octet * 10 + (c - 48), octet)
+        digits += is_digit
+        # A dot or the terminator closes an octet: 1-3 digits, value <= 255
+        closes = is_dot | (active & ~is_digit)
+        ok &= ~(closes & ((digits == 0) | (digits > 3) | (octet > 255)))
+        value = np.where(closes, (value << 8) | octet, value)
+        octet = np.where(closes, 0, octet)
+        digits = np.where(closes, 0, digits)
+        dots += is_dot
+        end = active & ~is_digit & ~is_dot
+        # The token must be exactly four octets followed by what ends a token
+        ok &= ~(end & ((dots != 3) | ((c != 32) & (c != 13) & (c != 10))))
+        done |= end
+    ok &= done
+    return value[ok], starts[~ok]
+
+
+class IPv4Counter:
+    """
+    Counts IPv4 clients as 32-bit ints instead of str dict keys (60+ bytes).
+    With NumPy, packed IPs collect in batches that are reduced with
+    np.unique(return_counts=True) and merged into sorted (keys, counts)
+    arrays: 12 bytes per distinct client. Without NumPy, each distinct token
+    of a block is packed once by pack_ipv4 into an int-keyed dict.
+    Tokens that are not canonical dotted quads go to a bytes-keyed dict
+    either way, so every IP has exactly one key and top() never lists it twice.
+    """
+
+    def __init__(self, batch_size: int = IPV4_BATCH) -> None:
+        self.np = load_numpy()
+        self.batch_size = batch_size
+        self.pending: list = []
+        self.pending_len = 0
+        self.keys = None
+        self.counts = None
+        self.int_counts: Dict[int, int] = {}
+        self.fallback: Counter = Counter()
+
+    def add_block(self, block: bytes) -> None:
+        if self.np is None:
+            tokens: Counter = Counter()
+            count_block(block, tokens)
+            for token, n in tokens.items():
+                value = pack_ipv4(token)
+                if value < 0:
+                    self.fallback[token] += n
+                else:
+                    self.int_counts[value] = self.int_counts.get(value, 0) + n
+            return
+        packed, rejects = vector_pack_block(self.np, block)
+        for start in rejects.tolist():
+            token = FIRST_TOKEN.match(block, start)
+            if not token:
+                continue
+            # The sweep also rejects valid quads it cannot see the end of
+            # (a last line without newline, a tab after the IP...)
+            value = pack_ipv4(token.group())
+            if value < 0:
+                self.fallback[token.group()] += 1
+            else:
+                self.int_counts[value] = self.int_counts.get(value, 0) + 1
+        self.pending.append(packed)
+        self.pending_len += len(packed)
+        if self.pending_len >= self.batch_size:
+            self.reduce()
+
+    def reduce(self) -> None:
+        """Fold pending batches and int_counts into the sorted (keys, counts) arrays."""
+        np = self.np
+        if not self.pending and not self.int_counts:
+            return
+        all_keys, all_counts = [], []
+        if self.pending:
+            keys, counts = np.unique(np.concatenate(self.pending), return_counts=True)
+            all_keys.append(keys)
+            all_counts.append(counts.astype(np.int64))
+            self.pending, self.pending_len = [], 0
+        if self.int_counts:
+            all_keys.append(np.fromiter(self.int_counts.keys(), dtype=np.uint32))
+            all_counts.append(np.fromiter(self.int_counts.values(), dtype=np.int64))
+            self.int_counts = {}
+        if self.keys is not None:
+            all_keys.append(self.keys)
+            all_counts.append(self.counts)
+        keys, counts = np.concatenate(all_keys), np.concatenate(all_counts)
+        if len(all_keys) > 1:
+            keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self.keys, self.counts = keys, counts
+
+    def top(self, k: int = 10) -> List[Tuple[str, int]]:
+        if self.np is None:
+            ints = heapq.nlargest(k, self.int_counts.items(), key=lambda kv: kv[1])
+        else:
+            self.reduce()
+            ints = []
+            if self.keys is not None and len(self.keys):
+                kk = min(k, len(self.counts))
+                idx = self.np.argpartition(-self.counts, kk - 1)[:kk]
+                ints = list(zip(self.keys[idx].tolist(), self.counts[idx].tolist()))
+        candidates = [(socket.inet_ntoa(struct.pack('!I', v)), n) for v, n in ints]
+        candidates.extend(top_decoded(self.fallback, k))
+        return heapq.nlargest(k, candidates, key=lambda kv: kv[1])
+
+
+def ipv4_top_k(log_path: str, k: int = 10) -> List[Tuple[str, int]]:
+    counter = IPv4Counter()
+    for block in block_stream(log_path):
+        counter.add_block(block)
+    return counter.top(k)
+
+
+def split_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into at most `parts` [start, end) byte ranges whose
+    boundaries sit just after a newline, so no line straddles two ranges.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    bounds = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, parts):
+            target = max(size * i // parts, bounds[-1])
+            nl = mm.find(b"\n", target - 1)
+            boundary = nl + 1 if nl != -1 else size
+            if boundary > bounds[-1] and boundary < size:
+                bounds.append(boundary)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def count_ranges(task: Tuple[str, List[Tuple[int, int]]]) -> Dict[bytes, int]:
+    """Worker: count leading IP tokens of every line in each [start, end) of the mmapped file."""
+    path, ranges = task
+    counts: Counter = Counter()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in ranges:
+            pos = start
+            while pos < end:
+                # Scan newline-aligned windows so the token list stays small
+                nl = mm.find(b"\n", min(pos + BLOCK_SIZE, end) - 1, end)
+                stop = nl + 1 if nl != -1 else end
+                count_block(mm, counts, pos, stop)
+                pos = stop
+    return counts
+
+
+def bytes_counts(log_path: str, prefetch: bool = True) -> Dict[bytes, int]:
+    """Exact IP counts from the block/regex path, keyed by undecoded bytes."""
+    counts: Counter = Counter()
+    for block in block_stream(log_path, prefetch=prefetch):
+        count_block(block, counts)
+    return counts
+
+
+def parallel_counts(log_path: str, workers: int) -> Dict[bytes, int]:
+    """
+    Fan byte ranges out to `workers` processes and merge their partial counters.
+    Each process sums all of its ranges into one counter, so the parent merges
+    `workers` counters rather than one per range. That merge is still serial:
+    it costs O(workers x distinct IPs) and bounds the speedup on logs with
+    many distinct IPs.
+    """
+    if compression_opener(log_path):
+        # A compressed stream has no random access to split; count it serially
+        return bytes_counts(log_path)
+    # Every worker takes every workers-th of 4x as many ranges, so a dense
+    # stretch of the file is shared out instead of landing on one process
+    ranges = split_ranges(log_path, workers * 4)
+    tasks = [(log_path, ranges[i::workers]) for i in range(min(workers, len(ranges)))]
+    totals: Dict[bytes, int] = {}
+    with multiprocessing.Pool(processes=workers) as pool:
+        for partial in pool.imap_unordered(count_ranges, tasks):
+            for ip, n in partial.items():
+                totals[ip] = totals.get(ip, 0) + n
+    return totals
+
+
+def top_decoded(totals: Dict[bytes, int], k: int = 10) -> List[Tuple[str, int]]:
+    """Top k of a bytes-keyed counter; only the winners are decoded."""
+    top = heapq.nlargest(k, totals.items(), key=lambda kv: kv[1])
+    return [(ip.decode('utf-8', errors='ignore'), n) for ip, n in top]
+
+
+def head_digest(path: str, length: int) -> str:
+    """sha256 of the first `length` bytes; detects a file replaced in place."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def load_checkpoint(checkpoint_path: str) -> Optional[dict]:
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ckpt.get("version") != CHECKPOINT_VERSION:
+        return None
+    return ckpt
+
+
+def save_checkpoint(checkpoint_path: str, ckpt: dict) -> None:
+    """Write to a temp file in the same directory, then rename over the old one."""
+    directory = os.path.dirname(os.path.abspath(checkpoint_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".ckpt_", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(ckpt, f)
+        os.replace(tmp_path, checkpoint_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def checkpoint_status(log_path: str, ckpt: Optional[dict]) -> str:
+    """
+    "resume" if the checkpoint describes a prefix of this very file, otherwise
+    the reason a full rebuild is needed ("fresh", "rotated", "truncated",
+    "rewritten").
+    """
+    if ckpt is None:
+        return "fresh"
+    st = os.stat(log_path)
+    if (st.st_ino, st.st_dev) != (ckpt["inode"], ckpt["device"]):
+        return "rotated"
+    if st.st_size < ckpt["offset"]:
+        return "truncated"
+    # Same inode and long enough, but copytruncate-style rotation or an
+    # editor rewrite could still have replaced the content: compare the head
+    if head_digest(log_path, ckpt["head_len"]) != ckpt["head_sha256"]:
+        return "rewritten"
+    return "resume"
+
+
+def count_appended(log_path: str, offset: int, counts: Counter) -> int:
+    """
+    Count complete lines from `offset` on. A trailing partial line (a writer
+    mid-append) is left for the next run. Returns the new offset.
+    """
+    with open_log(log_path) as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return offset
+            cut = block.rfind(b"\n")
+            if cut == -1:
+                carry += block
+                continue
+            count_block(carry + block[:cut + 1], counts)
+            offset += len(carry) + cut + 1
+            carry = block[cut + 1:]
+
+
+def checkpointed_counts(log_path: str, checkpoint_path: str) -> Tuple[Dict[bytes, int], str, int]:
+    """
+    Exact IP counts for log_path, reusing checkpoint_path when it is still
+    valid. Returns (counts, status, bytes parsed this run).
+    Counter keys are stored as latin-1 strings so every byte round-trips.
+    """
+    ckpt = load_checkpoint(checkpoint_path)
+    status = checkpoint_status(log_path, ckpt)
+    if compression_opener(log_path):
+        # Offsets into a compressed stream cannot be resumed cheaply
+        status = "compressed"
+    counts: Counter = Counter()
+    offset = 0
+    if status == "resume":
+        offset = ckpt["offset"]
+        counts.update({ip.encode('latin-1'): n for ip, n in ckpt["counts"].items()})
+    st = os.stat(log_path)
+    new_offset = count_appended(log_path, offset, counts)
+    head_len = min(HEAD_BYTES, new_offset)
+    save_checkpoint(checkpoint_path, {
+        "version": CHECKPOINT_VERSION,
+        "inode": st.st_ino,
+        "device": st.st_dev,
+        "size": st.st_size,
+        "offset": new_offset,
+        "head_len": head_len,
+        "head_sha256": head_digest(log_path, head_len),
+        "counts": {ip.decode('latin-1'): n for ip, n in counts.items()},
+    })
+    return counts, status, new_offset - offset
+
+
+def parse_clf_time(stamp: bytes) -> Optional[int]:
+    """
+    Epoch seconds of a CLF timestamp body such as b"24/Jan/2026:10:00:00 +0000".
+    Fixed offsets instead of strptime: this runs once per followed line.
+    """
+    if len(stamp) < 26 or stamp[2:3] != b"/" or stamp[20:21] != b" ":
+        return None
+    month = MONTHS.get(stamp[3:6])
+    if month is None:
+        return None
+    try:
+        day, year = int(stamp[0:2]), int(stamp[7:11])
+        hour, minute, second = int(stamp[12:14]), int(stamp[15:17]), int(stamp[18:20])
+        tz = int(stamp[22:24]) * 3600 + int(stamp[24:26]) * 60
+    except ValueError:
+        return None
+    if stamp[21:22] == b"-":
+        tz = -tz
+    return calendar.timegm((year, month, day, hour, minute, second)) - tz
+
+
+def parse_clf_block(buf) -> Iterator[Tuple[bytes, int, bytes, bytes, int, int]]:
+    """
+    Yield (ip, epoch, method, path, status, size) for every well-formed CLF
+    line in buf. Lines that do not match (or carry a bad timestamp) are skipped.
+    Consecutive lines usually share a timestamp, so the last one is cached.
+    """
+    last_stamp = None
+    last_ts = None
+    for ip, stamp, method, path, status, size in CLF_LINE.findall(buf):
+        if stamp != last_stamp:
+            last_stamp, last_ts = stamp, parse_clf_time(stamp)
+        if last_ts is None:
+            continue
+        yield ip, last_ts, method, path, int(status), 0 if size == b"-" else int(size)
+
+
+def line_time(line: bytes) -> Optional[int]:
+    """Timestamp of a CLF line: the text between the first '[' and ']'."""
+    start = line.find(b"[")
+    if start == -1:
+        return None
+    return parse_clf_time(line[start + 1:start + 27])
+
+
+class WindowedTopK:
+    """
+    Exact per-IP counts over the trailing `window` seconds of log time.
+    Hits are grouped into one slot per second of their own timestamp, so a
+    line that arrives out of order expires exactly when its second leaves
+    the window. A min-heap of slot seconds finds the oldest slot: add() is
+    O(log s) for s live seconds, and each (second, ip) entry is expired
+    exactly once, so memory is bounded by the distinct IPs per second
+    inside the window. top() is O(n log k) and is only paid when the list
+    is displayed.
+    """
+
+    def __init__(self, window: int = 300) -> None:
+        self.window = window
+        self.slots: Dict[int, Dict[bytes, int]] = {}
+        self.seconds: List[int] = []  # heap of the keys of slots
+        self.counts: Dict[bytes, int] = {}
+        self.newest: Optional[int] = None
+
+    def add(self, ts: int, ip: bytes) -> None:
+        if self.newest is None or ts > self.newest:
+            self.newest = ts
+            self.expire()
+        elif ts <= self.newest - self.window:
+            return  # arrived after its window closed
+        slot = self.slots.get(ts)
+        if slot is None:
+            slot = self.slots[ts] = {}
+            heapq.heappush(self.seconds, ts)
+        slot[ip] = slot.get(ip, 0) + 1
+        self.counts[ip] = self.counts.get(ip, 0) + 1
+
+    def expire(self) -> None:
+        cutoff = self.newest - self.window
+        while self.seconds and self.seconds[0] <= cutoff:
+            slot = self.slots.pop(heapq.heappop(self.seconds))
+            for ip, n in slot.items():
+                left = self.counts[ip] - n
+                if left:
+                    self.counts[ip] = left
+                else:
+                    del self.counts[ip]
+
+    def top(self, k: int = 10) -> List[Tuple[str, int]]:
+        return top_decoded(self.counts, k)
+
+
+def follow_lines(path: str, from_start: bool = False,
+                 poll_interval: float = 0.5) -> Iterator[Optional[bytes]]:
+    """
+    Yield complete lines appended to `path`, following it across rotation
+    and truncation like `tail -F`. Yields None whenever there is nothing new,
+    so the caller gets a chance to refresh its display.
+    """
+    f = None
+    inode = None
+    carry = b""
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(path, 'rb')
+                except FileNotFoundError:
+                    # Everything in a file that appears later is new
+                    from_start = True
+                    yield None
+                    time.sleep(poll_interval)
+                    continue
+                inode = os.fstat(f.fileno()).st_ino
+                if not from_start:
+                    f.seek(0, os.SEEK_END)
+                # Files that appear after a rotation are always read from the start
+                from_start = True
+                carry = b""
+            block = f.read(BLOCK_SIZE)
+            if block:
+                lines = (carry + block).split(b"\n")
+                carry = lines.pop()
+                yield from lines
+                continue
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                st = None
+            if st is None or st.st_ino != inode:
+                # Rotated: the old file was drained above, switch to the new one
+                f.close()
+                f = None
+            elif st.st_size < f.tell():
+                f.seek(0)
+                carry = b""
+            else:
+                yield None
+                time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def follow_top(log_path: str, window: int, refresh: float, from_start: bool = False) -> None:
+    """Print the top 10 IPs of the trailing window every `refresh` seconds until Ctrl-C."""
+    topk = WindowedTopK(window)
+    last_print = 0.0
+    for line in follow_lines(log_path, from_start=from_start):
+        if line is not None:
+            ip = FIRST_TOKEN.match(line)
+            ts = line_time(line)
+            if ip and ts is not None:
+                topk.add(ts, ip.group())
+        now = time.monotonic()
+        if now - last_print < refresh or topk.newest is None:
+            continue
+        last_print = now
+        newest = time.strftime("%d/%b/%Y:%H:%M:%S", time.gmtime(topk.newest))
+        print(f"\nTop 10 IP addresses, {window}s window ending {newest} UTC:")
+        for rank, (ip, count) in enumerate(topk.top(10), start=1):
+            print(f"{rank:2d}. {ip} -> {count}")
+
+
+def compute_top10(log_path: str, buckets: int = 1024, mode: str = "bucket",
+                  workers: int = 1, memory_mb: int = DEFAULT_MEMORY_MB) -> List[Tuple[str, int]]:
     """
-    Compute global top 10 by:
+    mode="sketch" returns the upper-bound estimates from sketch_top_k.
+    mode="hybrid" counts exactly within `memory_mb` (hybrid_top_k).
+    mode="ipv4" counts exactly with integer-packed IPv4 keys (ipv4_top_k).
+    mode="parallel" counts exactly with `workers` processes (parallel_counts).
+    mode="bytes" counts exactly in this process from raw blocks (bytes_counts).
+
+    Otherwise compute global top 10 by:
     1) Bucketizing IPs to temporary files (streaming input)
     2) Computing per-bucket top 10 with a dict and heapq.nlargest
     3) Merging all candidates to final global top 10 via heapq.nlargest
     This approach keeps memory bounded since we never hold all counts at once.
     """
+    if mode == "sketch":
+        return [(ip, upper) for ip, _, upper in sketch_top_k(log_path, k=10)]
+    if mode == "hybrid":
+        return hybrid_top_k(log_path, k=10, memory_mb=memory_mb)[0]
+    if mode == "ipv4":
+        return ipv4_top_k(log_path, k=10)
+    if mode in ("parallel", "bytes"):
+        if mode == "parallel":
+            totals = parallel_counts(log_path, workers)
+        else:
+            totals = bytes_counts(log_path)
+        return top_decoded(totals)
+    if mode != "bucket":
+        raise ValueError(f"Unknown mode: {mode}")
     bucket_paths = bucketize_ips(log_path, buckets=buckets)
     candidates: List[Tuple[str, int]] = []
     try:
@@ -91,17 +981,251 @@ def compute_top10(log_path: str, buckets: int = 1024) -> List[Tuple[str, int]]:
             shutil.rmtree(os.path.dirname(bucket_paths[0]), ignore_errors=True)
 
 
+def count_lines(path: str) -> int:
+    return sum(chunk.count(b"\n") for chunk in read_chunks(path))
+
+
+def benchmark_compressed(log_path: str) -> None:
+    """
+    MB/s of compressed input for: decompress-then-parse in one thread, the
+    prefetching pipeline, and the shell baseline `zcat | python` (the
+    decompressor as a separate process writing plain text into a pipe).
+    """
+    opener = compression_opener(log_path)
+    if opener is None:
+        print("Input is not compressed; nothing to compare")
+        return
+    tool = {gzip.open: "gzip", bz2.open: "bzip2", lzma.open: "xz"}[opener]
+    mb = os.path.getsize(log_path) / (1024 * 1024)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def shell_baseline() -> None:
+        decompress = subprocess.Popen([tool, '-dc', log_path], stdout=subprocess.PIPE)
+        subprocess.run(
+            [sys.executable, '-c', 'import top_ips_heap as t; t.bytes_counts("/dev/stdin")'],
+            stdin=decompress.stdout, cwd=script_dir, check=True,
+        )
+        decompress.stdout.close()
+        decompress.wait()
+
+    runs = [
+        ("serial", lambda: bytes_counts(log_path, prefetch=False)),
+        ("pipelined", lambda: bytes_counts(log_path, prefetch=True)),
+    ]
+    if shutil.which(tool):
+        runs.append((f"{tool} -dc | python", shell_baseline))
+    print(f"{'path':<20} {'seconds':>9} {'MB/s':>9}  (compressed input: {mb:.1f} MB)")
+    for label, fn in runs:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<20} {elapsed:9.3f} {mb / elapsed:9.1f}")
+
+
+def benchmark_parsers(log_path: str) -> None:
+    """Microbenchmark: lines/sec of the decode-per-line path vs the raw bytes path."""
+    lines = count_lines(log_path)
+
+    def str_path() -> None:
+        counts: Dict[str, int] = {}
+        for line in line_stream(log_path):
+            ip = extract_ip(line)
+            if ip:
+                counts[ip] = counts.get(ip, 0) + 1
+
+    def bytes_path() -> None:
+        bytes_counts(log_path)
+
+    print(f"{'parser':<8} {'seconds':>9} {'lines/s':>12}")
+    for label, fn in (("str", str_path), ("bytes", bytes_path)):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<8} {elapsed:9.3f} {lines / elapsed:12.0f}")
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # deleted between listing and stat
+    return total
+
+
+def run_engine(log_path: str, mode: str, workers: int = 1) -> Dict[str, float]:
+    """
+    Run one `--mode` child of this script and measure it. Peak RSS comes
+    from os.wait4, i.e. that child alone; a private TMPDIR polled while it
+    runs gives its peak temp-disk usage (bucket files, spilled runs).
+    """
+    tmp = tempfile.mkdtemp(prefix="log_bench_")
+    env = dict(os.environ, TMPDIR=tmp)
+    argv = [sys.executable, os.path.abspath(__file__), log_path,
+            "--mode", mode, "--workers", str(workers)]
+    peak_disk = 0
+    done = threading.Event()
+
+    def poll_disk() -> None:
+        nonlocal peak_disk
+        while not done.wait(POLL_INTERVAL):
+            peak_disk = max(peak_disk, dir_size(tmp))
+
+    poller = threading.Thread(target=poll_disk, daemon=True)
+    try:
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL, env=env)
+        poller.start()
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        done.set()
+        if poller.is_alive():
+            poller.join()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "exit_code": proc.returncode,
+        "wall_seconds": round(wall, 4),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+        "peak_temp_disk_bytes": peak_disk,
+        "user_seconds": round(usage.ru_utime, 4),
+        "system_seconds": round(usage.ru_stime, 4),
+    }
+
+
+def benchmark_modes(log_path: str, modes: List[str], max_workers: int = 1,
+                    out=None) -> List[dict]:
+    """
+    Run each mode in a fresh child process (run_engine) and print one table
+    row per run to `out` (stdout by default). The parallel mode is run with
+    1, 2, 4, ... workers up to max_workers to show scaling. Peak RSS of the
+    parallel mode is the parent's only; workers are grandchildren. Returns
+    the per-run stats.
+    """
+    size = os.path.getsize(log_path)
+    lines = count_lines(log_path)
+    runs: List[Tuple[str, int]] = []
+    for mode in modes:
+        if mode != "parallel":
+            runs.append((mode, 1))
+            continue
+        w = 1
+        while True:
+            runs.append((mode, w))
+            if w >= max_workers:
+                break
+            w = min(w * 2, max_workers)
+    print(f"{'mode':<12} {'seconds':>9} {'lines/s':>12} {'MB/s':>8} {'peak RSS MB':>12} {'peak tmp MB':>12}",
+          file=out)
+    results = []
+    for mode, workers in runs:
+        stats = run_engine(log_path, mode, workers)
+        wall = stats["wall_seconds"]
+        stats.update({
+            "engine": mode,
+            "workers": workers,
+            "lines_per_sec": round(lines / wall),
+            "mb_per_sec": round(size / (1 << 20) / wall, 2),
+        })
+        results.append(stats)
+        label = f"{mode}x{workers}" if mode == "parallel" else mode
+        print(f"{label:<12} {wall:9.3f} {stats['lines_per_sec']:12d} {stats['mb_per_sec']:8.1f} "
+              f"{stats['peak_rss_bytes'] / (1 << 20):12.1f} {stats['peak_temp_disk_bytes'] / (1 << 20):12.1f}",
+              file=out)
+    return results
+
+
 def main(argv: List[str]) -> int:
-    if len(argv) < 2:
-        print("Usage: python3 top_ips_heap.py /path/to/access.log")
-        return 2
-    log_path = argv[1]
+    parser = argparse.ArgumentParser(prog="top_ips_heap.py",
+                                     description="Top 10 client IPs of an access log")
+    parser.add_argument("log_path")
+    parser.add_argument("--mode", choices=MODES, default="bucket")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare throughput, peak RSS and temp disk of every mode "
+                             "(log_benchmark.py emits the same runs as JSON)")
+    parser.add_argument("--parse-benchmark", action="store_true",
+                        help="compare lines/sec of the str and bytes parsers")
+    parser.add_argument("--compressed-benchmark", action="store_true",
+                        help="compare serial, pipelined and zcat|python decompression")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="resume exact counting from (and update) this checkpoint file")
+    parser.add_argument("--follow", action="store_true",
+                        help="tail the log (tail -F) and report a sliding time window")
+    parser.add_argument("--window", type=int, default=300,
+                        help="--follow window length in seconds of log time (default: 300)")
+    parser.add_argument("--refresh", type=float, default=2.0,
+                        help="--follow seconds between reports (default: 2)")
+    parser.add_argument("--from-start", action="store_true",
+                        help="--follow reads the existing content first instead of starting at the end")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                        help=f"--mode hybrid in-memory budget before spilling (default: {DEFAULT_MEMORY_MB})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for --mode parallel (default: CPU count)")
+    args = parser.parse_args(argv[1:])
+    log_path = args.log_path
+    if args.follow:
+        # Like tail -F, the file is allowed to appear later
+        try:
+            follow_top(log_path, args.window, args.refresh, from_start=args.from_start)
+        except KeyboardInterrupt:
+            pass
+        return 0
     if not os.path.isfile(log_path):
         print(f"Error: File not found: {log_path}")
         return 2
 
-    print("Streaming and bucketizing log... (this may take time for large files)")
-    top10 = compute_top10(log_path, buckets=1024)
+    if args.compressed_benchmark:
+        benchmark_compressed(log_path)
+        return 0
+
+    if args.parse_benchmark:
+        benchmark_parsers(log_path)
+        return 0
+
+    if args.benchmark:
+        benchmark_modes(log_path, list(MODES), max_workers=args.workers)
+        return 0
+
+    if args.checkpoint:
+        counts, status, parsed = checkpointed_counts(log_path, args.checkpoint)
+        if status == "resume":
+            print(f"Resumed from checkpoint: parsed {parsed} appended bytes")
+        else:
+            print(f"Full rebuild ({status}): parsed {parsed} bytes")
+        print("\nTop 10 IP addresses:")
+        for rank, (ip, count) in enumerate(top_decoded(counts), start=1):
+            print(f"{rank:2d}. {ip} -> {count}")
+        return 0
+
+    if args.mode == "sketch":
+        print("Streaming log through Misra-Gries + Count-Min sketch...")
+        top = sketch_top_k(log_path, k=10)
+        print("\nTop 10 IP addresses (true count within [lower, upper]):")
+        for rank, (ip, lower, upper) in enumerate(top, start=1):
+            print(f"{rank:2d}. {ip} -> {upper} [{lower}, {upper}]")
+        return 0
+
+    if args.mode == "hybrid":
+        print(f"Counting in memory up to {args.memory_mb} MB, spilling only on overflow...")
+        top10, runs = hybrid_top_k(log_path, k=10, memory_mb=args.memory_mb)
+        print(f"\nTop 10 IP addresses ({runs} sorted run(s) spilled to disk):")
+        for rank, (ip, count) in enumerate(top10, start=1):
+            print(f"{rank:2d}. {ip} -> {count}")
+        return 0
+
+    if args.mode == "parallel":
+        print(f"Counting byte ranges with {args.workers} worker process(es)...")
+    elif args.mode == "bytes":
+        print("Counting IP tokens from raw byte blocks...")
+    elif args.mode == "ipv4":
+        print("Counting IPv4 clients as packed 32-bit integers...")
+    else:
+        print("Streaming and bucketizing log... (this may take time for large files)")
+    top10 = compute_top10(log_path, buckets=1024, mode=args.mode, workers=args.workers)
     print("\nTop 10 IP addresses:")
     for rank, (ip, count) in enumerate(top10, start=1):
         print(f"{rank:2d}. {ip} -> {count}")
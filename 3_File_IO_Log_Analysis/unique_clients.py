@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import math
+import time
+import base64
+import hashlib
+import argparse
+import multiprocessing
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from top_ips_heap import extract_ip, line_stream, parse_clf_time
+
+"""
+Distinct-client cardinality of access logs with HyperLogLog.
+Constraints:
+- Fed by the same line_stream / extract_ip pipeline as top_ips_heap.py
+- Fixed memory per group: 2^p one-byte registers (16 KB at p=14, ~0.8% error)
+- Registers merge with an element-wise max, so sketches built from
+  different files, processes or runs combine into the exact same sketch
+  the union would have produced
+- Sketches serialize to disk and can be merged into later runs
+- An exact (set-based) mode for small inputs, to measure the error
+"""
+
+SKETCH_MAGIC = b"HLL1"
+GRANULARITIES = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "total": "total",
+}
+
+
+def hash64(item: str) -> int:
+    # blake2b rather than hash(): it must agree across processes and runs
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    The first p bits of a 64-bit hash pick a register; the register keeps the
+    longest run of leading zeros (plus one) seen in the remaining bits.
+    """
+
+    def __init__(self, p: int = 14, registers: Optional[bytearray] = None) -> None:
+        if not 4 <= p <= 18:
+            raise ValueError("precision p must be in [4, 18]")
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    def add(self, item: str) -> None:
+        h = hash64(item)
+        idx = h >> (64 - self.p)
+        rest_bits = 64 - self.p
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting over empty registers
+            return round(m * math.log(m / zeros))
+        # 64-bit hashes make the large-range correction unnecessary
+        return round(raw)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError(f"cannot merge p={other.p} into p={self.p}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_bytes(self) -> bytes:
+        return SKETCH_MAGIC + bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        if data[:4] != SKETCH_MAGIC:
+            raise ValueError("not a HyperLogLog sketch")
+        p = data[4]
+        registers = bytearray(data[5:])
+        if len(registers) != 1 << p:
+            raise ValueError("truncated HyperLogLog sketch")
+        return cls(p, registers)
+
+
+class ExactCounter:
+    """Set-based stand-in with the HyperLogLog interface, for small inputs."""
+
+    def __init__(self, items: Optional[Set[str]] = None) -> None:
+        self.items: Set[str] = items if items is not None else set()
+
+    def add(self, item: str) -> None:
+        self.items.add(item)
+
+    def estimate(self) -> int:
+        return len(self.items)
+
+    def merge(self, other: "ExactCounter") -> None:
+        self.items |= other.items
+
+    def to_bytes(self) -> bytes:
+        return "\n".join(sorted(self.items)).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ExactCounter":
+        return cls(set(data.decode('utf-8').split("\n")) - {""})
+
+
+Estimator = Union[HyperLogLog, ExactCounter]
+
+
+def new_estimator(exact: bool, p: int) -> Estimator:
+    return ExactCounter() if exact else HyperLogLog(p)
+
+
+def group_key(line: str, fmt: str) -> Optional[str]:
+    """Hour/day bucket of a CLF line, or None when it has no valid timestamp."""
+    if fmt == "total":
+        return "total"
+    start = line.find("[")
+    if start == -1:
+        return None
+    ts = parse_clf_time(line[start + 1:start + 27].encode('ascii', errors='ignore'))
+    if ts is None:
+        return None
+    return time.strftime(fmt, time.gmtime(ts))
+
+
+def count_file(task: Tuple[str, str, bool, int]) -> Dict[str, bytes]:
+    """Worker: one estimator per time bucket of one file, returned serialized."""
+    log_path, granularity, exact, p = task
+    fmt = GRANULARITIES[granularity]
+    groups: Dict[str, Estimator] = {}
+    for line in line_stream(log_path):
+        ip = extract_ip(line)
+        if not ip:
+            continue
+        key = group_key(line, fmt)
+        if key is None:
+            continue
+        est = groups.get(key)
+        if est is None:
+            est = groups[key] = new_estimator(exact, p)
+        est.add(ip)
+    return {key: est.to_bytes() for key, est in groups.items()}
+
+
+def merge_into(groups: Dict[str, Estimator], serialized: Dict[str, bytes], exact: bool) -> None:
+    cls = ExactCounter if exact else HyperLogLog
+    for key, data in serialized.items():
+        est = cls.from_bytes(data)
+        if key in groups:
+            groups[key].merge(est)
+        else:
+            groups[key] = est
+
+
+def count_unique(log_paths: List[str], granularity: str = "day", exact: bool = False,
+                 p: int = 14, workers: int = 1) -> Dict[str, Estimator]:
+    """Distinct clients per time bucket across every file; files fan out to `workers` processes."""
+    tasks = [(path, granularity, exact, p) for path in log_paths]
+    groups: Dict[str, Estimator] = {}
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(processes=min(workers, len(tasks))) as pool:
+            for serialized in pool.imap_unordered(count_file, tasks):
+                merge_into(groups, serialized, exact)
+    else:
+        for task in tasks:
+            merge_into(groups, count_file(task), exact)
+    return groups
+
+
+def save_sketches(path: str, groups: Dict[str, Estimator], exact: bool) -> None:
+    doc = {
+        "exact": exact,
+        "sketches": {key: base64.b64encode(est.to_bytes()).decode('ascii')
+                     for key, est in groups.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f)
+
+
+def load_sketches(path: str) -> Tuple[Dict[str, bytes], bool]:
+    with open(path, 'r', encoding='utf-8') as f:
+        doc = json.load(f)
+    return {key: base64.b64decode(data) for key, data in doc["sketches"].items()}, doc["exact"]
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="unique_clients.py",
+                                     description="Unique client IPs per hour/day (HyperLogLog)")
+    parser.add_argument("log_paths", nargs="+")
+    parser.add_argument("--by", choices=list(GRANULARITIES), default="day")
+    parser.add_argument("--precision", type=int, default=14,
+                        help="HyperLogLog p: 2^p registers, standard error ~1.04/sqrt(2^p)")
+    parser.add_argument("--exact", action="store_true", help="count with a set instead")
+    parser.add_argument("--compare", action="store_true",
+                        help="also count exactly and print the relative error")
+    parser.add_argument("--workers", type=int, default=1, help="processes, one file each")
+    parser.add_argument("--load", metavar="PATH", help="merge sketches saved by an earlier run")
+    parser.add_argument("--save", metavar="PATH", help="write the merged sketches here")
+    args = parser.parse_args(argv[1:])
+    for path in args.log_paths:
+        if not os.path.isfile(path):
+            print(f"Error: File not found: {path}")
+            return 2
+
+    groups = count_unique(args.log_paths, args.by, args.exact, args.precision, args.workers)
+    if args.load:
+        serialized, exact = load_sketches(args.load)
+        if exact != args.exact:
+            print("Error: saved sketches and this run disagree on --exact")
+            return 2
+        merge_into(groups, serialized, exact)
+    if args.save:
+        save_sketches(args.save, groups, args.exact)
+
+    truth: Dict[str, Estimator] = {}
+    if args.compare and not args.exact:
+        truth = count_unique(args.log_paths, args.by, True, args.precision, args.workers)
+    print(f"Unique clients per {args.by}:")
+    for key in sorted(groups):
+        n = groups[key].estimate()
+        line = f"{key}: {n}"
+        if key in truth:
+            actual = truth[key].estimate()
+            error = (n - actual) / actual * 100 if actual else 0.0
+            line += f" (exact {actual}, error {error:+.2f}%)"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))